@@ -1,3 +1,5 @@
+import click
+import hashlib
 import os
 from flask_openapi3 import OpenAPI, Info, Tag
 from flask import Flask, abort, request
@@ -5,31 +7,78 @@ from flask_cors import CORS
 from flask import redirect
 import logging
 
-from model import Session, Actor, Movie, ActorMovieAssociation, database_path
+import model
+from model import Session, Actor, Movie, ActorMovieAssociation, read_only, replica_client
+from model.pagination import paginate, page_size, seek, InvalidCursor
+from model.search import search, typeahead, TYPEAHEAD_SIZE
+from model.bulk import insert_actors, insert_movies, insert_associations, BULK_MAX_ITEMS
+from model.cast import replace_cast
+from model.projections import refresh_projections, rebuild_projections, movies_of, actors_of
 from schemas import *
 from auth.auth import AuthError, requires_auth
+from auth.auth import configure as configure_auth
+from utils.streaming import NDJSONResponse, wants_stream
+from utils.etag import bump, conditional, invalidates, ACTORS, MOVIES, ASSOCIATIONS
+from utils.cache import cached
+from utils.compression import compress_responses
+from utils.batch import run_batch
+from utils.instrumentation import instrument_requests
+from utils.metrics import instrument_app, render_metrics
+from utils.serialization import json_provider_class
 
 #
-# Enables or disables authentication
-# 
-enable_auth_var = os.getenv('ENABLE_AUTH')
-auth_enabled = enable_auth_var is None or enable_auth_var != '0'
+# Default configuration, read from the environment
+#
+def default_config():
+    """ Returns the settings set by the environment variables.
+    """
+    return {
+        "DATABASE_URL": os.environ.get('DATABASE_URL'),
+        # read replicas, comma-separated
+        "DATABASE_REPLICA_URLS": [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()],
+        # authentication is enabled unless ENABLE_AUTH=0
+        "ENABLE_AUTH": os.environ.get('ENABLE_AUTH') != '0',
+        "AUTH0_DOMAIN": os.environ.get('AUTH0_DOMAIN'),
+        "API_AUDIENCE": os.environ.get('API_AUDIENCE'),
+        "ALGORITHMS": [os.environ['ALGORITHMS']] if os.environ.get('ALGORITHMS') else None,
+        "JWKS_URL": os.environ.get('JWKS_URL'),
+        # JSON encoder of the responses: 'orjson', 'stdlib', or 'auto' (orjson when it is installed)
+        "JSON_PROVIDER": os.environ.get('JSON_PROVIDER', 'auto')
+    }
 
 #
 # Creates, initializes and runs the Flask application
 #
-def create_app():
-    
+def create_app(config=None):
+    """ Creates the application.
+
+    Arguments:
+        config: settings overriding the environment variables (DATABASE_URL, DATABASE_REPLICA_URLS,
+            ENABLE_AUTH, AUTH0_DOMAIN, API_AUDIENCE, ALGORITHMS, JWKS_URL and JSON_PROVIDER, see default_config).
+    """
+    config = {**default_config(), **(config or {})}
+    auth_enabled = config['ENABLE_AUTH']
+
     # openapi setup
     info = Info(title="FSND-Capstone", version="1.0.0")
     app = OpenAPI(__name__, info=info, security_schemes={"jwt": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}} if auth_enabled else None)
+
+    # the database and token issuer of the application (app.extensions): the database engine is only created when the first request needs it
+    model.configure(app, config['DATABASE_URL'], config['DATABASE_REPLICA_URLS'])
+    configure_auth(app, config['AUTH0_DOMAIN'], config['API_AUDIENCE'], config['ALGORITHMS'], config['JWKS_URL'])
         
     # openapi tags
     home_tag = Tag(name="Documentation", description="OpenAPI documentation")
     actors_tag = Tag(name="Actors", description="Actors API documentation")
     movies_tag = Tag(name="Movies", description="Movies API documentation")
     actor_movies_tag = Tag(name="Actor-Movies", description="Actor-Movies Association API documentation")
+    batch_tag = Tag(name="Batch", description="Batch API documentation")
         
+    app.config.update(config)
+
+    # fast JSON encoding of the responses (same output as Flask's default provider)
+    app.json = json_provider_class(config['JSON_PROVIDER'])(app)
+
     # avoid alphabetic ordering of the schema attributes in the documentation.
     app.json.sort_keys = False
 
@@ -42,6 +91,33 @@ def create_app():
 
     # cross-origin resource sharing
     CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    # per-request SQL statistics (Server-Timing header and log)
+    instrument_requests(app)
+
+    # request, authentication and connection pool metrics (Prometheus)
+    instrument_app(app)
+
+    # gzip/brotli compression of the responses (registered last, so that it runs before the metrics count the bytes sent)
+    compress_responses(app)
+
+    # the reads of a client follow its own writes (see model/replicas.py): clients are told apart by their access token, or else their address
+    @app.before_request
+    def identify_client():
+        authorization = request.headers.get('Authorization')
+        replica_client.set(hashlib.sha256(authorization.encode()).hexdigest() if authorization else request.remote_addr)
+
+    # request-scoped database session: released once the request is done. The handlers commit their
+    # writes themselves: whatever is left uncommitted (e.g. by a request failing with abort()) is rolled back
+    @app.teardown_request
+    def remove_session(exception=None):
+        if Session.registry.has():
+            try:
+                Session().rollback()
+            except Exception as e:
+                logger.error(f'Could not roll back the request session: {e}')
+            finally:
+                Session.remove()
             
     #
     # Endpoints (documentation)
@@ -57,23 +133,112 @@ def create_app():
         """Redirects to documentation page.
         """
         return redirect('/openapi/swagger')
+
+    #
+    # Endpoints (monitoring)
+    #
+    @app.get('/metrics', doc_ui=False)
+    def metrics():
+        """Exposes the metrics in the Prometheus text format.
+        """
+        body, content_type = render_metrics()
+        return app.response_class(body, content_type=content_type)
                
     #
     # Endpoints (actors)
     #
-    @app.get('/api/v1/actors', tags=[actors_tag], responses={"200": ActorListSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @app.get('/api/v1/actors', tags=[actors_tag], responses={"200": ActorListSchema, "304": None, "400": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('view:actors', auth_enabled)
-    def get_actors():
-        """Retrieves all actors.
+    @conditional(ACTORS, MOVIES, ASSOCIATIONS)
+    @cached(ACTORS, MOVIES, ASSOCIATIONS)
+    @read_only
+    def get_actors(query: ActorQuerySchema):
+        """Retrieves the actors, one page at a time.
         
-        Returns a representation of the list of actors.
+        Arguments:
+            limit: maximum number of actors in the page.
+            cursor: cursor returned along with the previous page.
+            stream: streams all the (remaining) actors as newline-delimited JSON instead.
+            fields: comma-separated list of the fields to return.
+            include: 'associations' to also return the associations when 'fields' is set.
+            gender, nationality: only the actors of this gender/nationality.
+            birth_date_from, birth_date_to: only the actors born within these dates (sorted by birth_date).
+            sort: field to sort by (then by id), prefixed with '-' for descending order.
+            ids: comma-separated list of ids, to retrieve several actors at once.
+        
+        Returns a representation of a page of the list of actors, along with the cursor of the next page.
         """
+        try:
+            fields, associations = Fieldset(query, ACTOR_FIELDS)
+            sort, descending = SortOrder(query, ACTOR_SORTS, 'birth_date' if query.birth_date_from is not None or query.birth_date_to is not None else None)
+            ids = IdList(query)
+        except (InvalidFieldset, InvalidSort, InvalidIds):
+            abort(400)
+        # the requested ids fit in a single page
+        if ids is not None and query.limit is None:
+            query.limit = max(len(ids), 1)
+        # the sort column is needed for the cursor, even when it is not returned
+        columns = fields + [sort.key] if fields is not None and sort is not None and sort.key not in fields else fields
         session = Session()
-        actors = session.query(Actor).all()
-        return ActorListRepresentation(actors), 200
+        actors_query = session.query(Actor).options(*ActorQueryOptions(columns, associations)).filter(*ActorFilters(query))
+        try:
+            if wants_stream(query.stream):
+                return NDJSONResponse(seek(actors_query, Actor.id, query.cursor, sort, descending), lambda actor: ActorRepresentation(actor, fields, associations))
+            actors, next_cursor = paginate(actors_query, Actor.id, query.limit, query.cursor, sort, descending)
+        except InvalidCursor:
+            abort(400)
+        return ActorListRepresentation(actors, next_cursor, fields, associations), 200
+
+    @app.get('/api/v1/actors/search', tags=[actors_tag], responses={"200": ActorSearchListSchema, "304": None}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('view:actors', auth_enabled)
+    @conditional(ACTORS)
+    @cached(ACTORS)
+    @read_only
+    def search_actors(query: ActorSearchSchema):
+        """Searches the actors by name.
+        
+        Arguments:
+            q: words of the names to search for.
+            limit: maximum number of results.
+            typeahead: returns the actors whose name starts with q instead, in alphabetical order.
+        
+        Returns the matching actors, best matches first.
+        """
+        session = Session()
+        if query.typeahead:
+            results = typeahead(session, Actor, Actor.name, query.q, page_size(query.limit or TYPEAHEAD_SIZE))
+        else:
+            results = search(session, Actor, Actor.name, query.q, page_size(query.limit))
+        return ActorSearchRepresentation(results), 200
+
+    @app.get('/api/v1/actors/<int:id>', tags=[actors_tag], responses={"200": ActorViewSchema, "304": None, "400": ErrorSchema, "404": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('view:actors', auth_enabled)
+    @conditional(ACTORS, MOVIES, ASSOCIATIONS)
+    @cached(ACTORS, MOVIES, ASSOCIATIONS)
+    @read_only
+    def get_actor(path: ActorPathSchema, query: FieldsQuerySchema):
+        """Retrieves an actor.
+        
+        Arguments:
+            id: the actor's id.
+            fields: comma-separated list of the fields to return.
+            include: 'associations' to also return the associations when 'fields' is set.
+        
+        Returns a representation of the actor.
+        """
+        try:
+            fields, associations = Fieldset(query, ACTOR_FIELDS)
+        except InvalidFieldset:
+            abort(400)
+        session = Session()
+        actor = session.query(Actor).options(*ActorQueryOptions(fields, associations)).filter(Actor.id == path.id).first()
+        if actor is None:
+            abort(404)
+        return ActorRepresentation(actor, fields, associations), 200
 
     @app.post('/api/v1/actors', tags=[actors_tag], responses={"200": ActorViewSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('post:actors', auth_enabled)
+    @invalidates(ACTORS)
     def create_actor(form: ActorAddSchema):
         """Creates a new actor.
         
@@ -94,6 +259,7 @@ def create_app():
         
     @app.delete('/api/v1/actors/<int:id>', tags=[actors_tag], responses={"200": ActorViewSchema, "404": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('delete:actors', auth_enabled)
+    @invalidates(ACTORS, ASSOCIATIONS)
     def delete_actor(path: ActorPathSchema):
         """Deletes an actor.
         
@@ -103,19 +269,24 @@ def create_app():
         Returns a status message.
         """
         session = Session()
-        actor = session.query(Actor).filter(Actor.id == path.id).first()
+        actor = session.query(Actor).options(*ActorQueryOptions()).filter(Actor.id == path.id).first()
         if actor is None:
             abort(404)
         try:
+            representation = ActorRepresentation(actor)
+            # the casts the actor appears in
+            movie_ids = movies_of(session, [path.id])
             session.delete(actor)
+            refresh_projections(session, movie_ids=movie_ids)
             session.commit()
-            return ActorRepresentation(actor), 200
+            return representation, 200
         except Exception as e:
             #logger.error(e)
             abort(422)
 
     @app.patch('/api/v1/actors/<int:id>', tags=[actors_tag], responses={"200": ActorViewSchema, "404": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('update:actors', auth_enabled)
+    @invalidates(ACTORS)
     def update_actor(path: ActorPathSchema, form: ActorPatchSchema):
         """Updates an actor.
         
@@ -126,7 +297,7 @@ def create_app():
         Returns a representation of the updated actor.
         """        
         session = Session()
-        actor = session.query(Actor).filter(Actor.id == path.id).first()
+        actor = session.query(Actor).options(*ActorQueryOptions()).filter(Actor.id == path.id).first()
         if actor is None:
             abort(404)
         try:
@@ -134,28 +305,136 @@ def create_app():
             actor.gender = form.gender
             actor.birth_date = form.birth_date
             actor.nationality = form.nationality
+            # the casts the actor appears in hold the actor's name
+            refresh_projections(session, movie_ids=movies_of(session, [path.id]))
             session.commit()
+            # reloads the committed actor along with its associations
+            actor = session.query(Actor).options(*ActorQueryOptions()).filter(Actor.id == path.id).one()
             return ActorRepresentation(actor), 200
         except Exception as e:
             #logger.error(e)
             abort(422)
 
+    @app.post('/api/v1/actors/bulk', tags=[actors_tag], responses={"200": BulkResultSchema, "413": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('post:actors', auth_enabled)
+    @invalidates(ACTORS)
+    def create_actors(body: ActorBulkAddSchema):
+        """Creates several actors at once.
+        
+        Arguments:
+            actors: list of actors' data (at most BULK_MAX_ITEMS).
+        
+        Returns the per-item results: the actors created, and the reason why the others were not.
+        """
+        if len(body.actors) > BULK_MAX_ITEMS:
+            abort(413)
+        session = Session()
+        rows, results = BulkValidate(body.actors, ActorAddSchema, dates=('birth_date',))
+        try:
+            insert_actors(session, rows, results)
+            session.commit()
+        except Exception as e:
+            #logger.error(e)
+            # the batches inserted before the failure are not kept
+            session.rollback()
+            abort(422)
+        return BulkResultRepresentation(results), 200
+
     #
     # Endpoints (movies)
     #
-    @app.get('/api/v1/movies', tags=[movies_tag], responses={"200": MovieListSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @app.get('/api/v1/movies', tags=[movies_tag], responses={"200": MovieListSchema, "304": None, "400": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('view:movies', auth_enabled)
+    @conditional(MOVIES, ACTORS, ASSOCIATIONS)
+    @cached(MOVIES, ACTORS, ASSOCIATIONS)
+    @read_only
+    def get_movies(query: MovieQuerySchema):
+        """Retrieves the movies, one page at a time.
+        
+        Arguments:
+            limit: maximum number of movies in the page.
+            cursor: cursor returned along with the previous page.
+            stream: streams all the (remaining) movies as newline-delimited JSON instead.
+            fields: comma-separated list of the fields to return.
+            include: 'associations' to also return the associations when 'fields' is set.
+            genre: only the movies of this genre.
+            release_date_from, release_date_to: only the movies released within these dates (sorted by release_date).
+            sort: field to sort by (then by id), prefixed with '-' for descending order.
+            ids: comma-separated list of ids, to retrieve several movies at once.
+        
+        Returns a representation of a page of the list of movies, along with the cursor of the next page.
+        """
+        try:
+            fields, associations = Fieldset(query, MOVIE_FIELDS)
+            sort, descending = SortOrder(query, MOVIE_SORTS, 'release_date' if query.release_date_from is not None or query.release_date_to is not None else None)
+            ids = IdList(query)
+        except (InvalidFieldset, InvalidSort, InvalidIds):
+            abort(400)
+        # the requested ids fit in a single page
+        if ids is not None and query.limit is None:
+            query.limit = max(len(ids), 1)
+        # the sort column is needed for the cursor, even when it is not returned
+        columns = fields + [sort.key] if fields is not None and sort is not None and sort.key not in fields else fields
+        session = Session()
+        movies_query = session.query(Movie).options(*MovieQueryOptions(columns, associations)).filter(*MovieFilters(query))
+        try:
+            if wants_stream(query.stream):
+                return NDJSONResponse(seek(movies_query, Movie.id, query.cursor, sort, descending), lambda movie: MovieRepresentation(movie, fields, associations))
+            movies, next_cursor = paginate(movies_query, Movie.id, query.limit, query.cursor, sort, descending)
+        except InvalidCursor:
+            abort(400)
+        return MovieListRepresentation(movies, next_cursor, fields, associations), 200
+
+    @app.get('/api/v1/movies/search', tags=[movies_tag], responses={"200": MovieSearchListSchema, "304": None}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('view:movies', auth_enabled)
+    @conditional(MOVIES)
+    @cached(MOVIES)
+    @read_only
+    def search_movies(query: MovieSearchSchema):
+        """Searches the movies by title.
+        
+        Arguments:
+            q: words of the titles to search for.
+            limit: maximum number of results.
+            typeahead: returns the movies whose title starts with q instead, in alphabetical order.
+        
+        Returns the matching movies, best matches first.
+        """
+        session = Session()
+        if query.typeahead:
+            results = typeahead(session, Movie, Movie.title, query.q, page_size(query.limit or TYPEAHEAD_SIZE))
+        else:
+            results = search(session, Movie, Movie.title, query.q, page_size(query.limit))
+        return MovieSearchRepresentation(results), 200
+
+    @app.get('/api/v1/movies/<int:id>', tags=[movies_tag], responses={"200": MovieViewSchema, "304": None, "400": ErrorSchema, "404": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('view:movies', auth_enabled)
-    def get_movies():
-        """Retrieves all movies.
+    @conditional(MOVIES, ACTORS, ASSOCIATIONS)
+    @cached(MOVIES, ACTORS, ASSOCIATIONS)
+    @read_only
+    def get_movie(path: MoviePathSchema, query: FieldsQuerySchema):
+        """Retrieves a movie.
         
-        Returns a representation of the list of movies.
+        Arguments:
+            id: the movie's id.
+            fields: comma-separated list of the fields to return.
+            include: 'associations' to also return the associations when 'fields' is set.
+        
+        Returns a representation of the movie.
         """
+        try:
+            fields, associations = Fieldset(query, MOVIE_FIELDS)
+        except InvalidFieldset:
+            abort(400)
         session = Session()
-        movies = session.query(Movie).all()
-        return MovieListRepresentation(movies), 200
+        movie = session.query(Movie).options(*MovieQueryOptions(fields, associations)).filter(Movie.id == path.id).first()
+        if movie is None:
+            abort(404)
+        return MovieRepresentation(movie, fields, associations), 200
 
     @app.post('/api/v1/movies', tags=[movies_tag], responses={"200": MovieViewSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('post:movies', auth_enabled)
+    @invalidates(MOVIES)
     def create_movie(form: MovieAddSchema):
         """Creates a new movie.
         
@@ -176,6 +455,7 @@ def create_app():
 
     @app.delete('/api/v1/movies/<int:id>', tags=[movies_tag], responses={"200": MovieViewSchema, "404": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('delete:movies', auth_enabled)
+    @invalidates(MOVIES, ASSOCIATIONS)
     def delete_movie(path: MoviePathSchema):
         """Deletes an movie.
         
@@ -185,19 +465,24 @@ def create_app():
         Returns a status message.
         """
         session = Session()
-        movie = session.query(Movie).filter(Movie.id == path.id).first()
+        movie = session.query(Movie).options(*MovieQueryOptions()).filter(Movie.id == path.id).first()
         if movie is None:
             abort(404)
         try:
+            representation = MovieRepresentation(movie)
+            # the filmographies the movie appears in
+            actor_ids = actors_of(session, [path.id])
             session.delete(movie)
+            refresh_projections(session, actor_ids=actor_ids)
             session.commit()
-            return MovieRepresentation(movie), 200
+            return representation, 200
         except Exception as e:
             #logger.error(e)
             abort(422)
 
     @app.patch('/api/v1/movies/<int:id>', tags=[movies_tag], responses={"200": MovieViewSchema, "404": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('update:movies', auth_enabled)
+    @invalidates(MOVIES)
     def update_movie(path: MoviePathSchema, form: MoviePatchSchema):
         """Updates an movie.
         
@@ -208,24 +493,83 @@ def create_app():
         Returns a representation of the updated movie.
         """
         session = Session()
-        movie = session.query(Movie).filter(Movie.id == path.id).first()
+        movie = session.query(Movie).options(*MovieQueryOptions()).filter(Movie.id == path.id).first()
         if movie is None:
             abort(404)
         try:
             movie.title = form.title
             movie.genre = form.genre
             movie.release_date = form.release_date
+            # the filmographies the movie appears in hold the movie's title
+            refresh_projections(session, actor_ids=actors_of(session, [path.id]))
             session.commit()
+            # reloads the committed movie along with its associations
+            movie = session.query(Movie).options(*MovieQueryOptions()).filter(Movie.id == path.id).one()
             return MovieRepresentation(movie), 200
         except Exception as e:
             #logger.error(e)
             abort(422) 
 
+    @app.put('/api/v1/movies/<int:id>/cast', tags=[movies_tag], responses={"200": MovieViewSchema, "404": ErrorSchema, "413": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('update:movies', auth_enabled)
+    @invalidates(ASSOCIATIONS)
+    def update_movie_cast(path: MoviePathSchema, body: MovieCastSchema):
+        """Replaces the cast of a movie.
+        
+        Arguments:
+            id: the movie's id.
+            cast: the desired cast (actor's id and character name pairs).
+        
+        Returns a representation of the updated movie.
+        """
+        if len(body.cast) > BULK_MAX_ITEMS:
+            abort(413)
+        cast = {member.actor_id: member.character_name for member in body.cast}
+        if len(cast) != len(body.cast):
+            abort(422)
+        session = Session()
+        if session.query(Movie.id).filter(Movie.id == path.id).first() is None:
+            abort(404)
+        try:
+            replace_cast(session, path.id, cast)
+            session.commit()
+            movie = session.query(Movie).options(*MovieQueryOptions()).filter(Movie.id == path.id).one()
+            return MovieRepresentation(movie), 200
+        except Exception as e:
+            #logger.error(e)
+            abort(422)
+
+    @app.post('/api/v1/movies/bulk', tags=[movies_tag], responses={"200": BulkResultSchema, "413": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('post:movies', auth_enabled)
+    @invalidates(MOVIES)
+    def create_movies(body: MovieBulkAddSchema):
+        """Creates several movies at once.
+        
+        Arguments:
+            movies: list of movies' data (at most BULK_MAX_ITEMS).
+        
+        Returns the per-item results: the movies created, and the reason why the others were not.
+        """
+        if len(body.movies) > BULK_MAX_ITEMS:
+            abort(413)
+        session = Session()
+        rows, results = BulkValidate(body.movies, MovieAddSchema, dates=('release_date',))
+        try:
+            insert_movies(session, rows, results)
+            session.commit()
+        except Exception as e:
+            #logger.error(e)
+            # the batches inserted before the failure are not kept
+            session.rollback()
+            abort(422)
+        return BulkResultRepresentation(results), 200
+
     #
     # Endpoints (actor-movies associations)
     #
     @app.post('/api/v1/actor-movie', tags=[actor_movies_tag], responses={"200": ActorMovieSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('update:movies', auth_enabled)
+    @invalidates(ASSOCIATIONS)
     def create_association(form: ActorMovieSchema):
         """Creates a new actor-movie association.
         
@@ -238,6 +582,7 @@ def create_app():
             session = Session()
             actor_movie = ActorMovieAssociation(actor_id=form.actor_id,  movie_id=form.movie_id, character_name=form.character_name)
             session.add(actor_movie)
+            refresh_projections(session, actor_ids=[form.actor_id], movie_ids=[form.movie_id])
             session.commit()
             return ActorMovieRepresentation(actor_movie), 200
         except Exception as e:
@@ -246,6 +591,7 @@ def create_app():
 
     @app.delete('/api/v1/actor-movie', tags=[actor_movies_tag], responses={"200": ActorMovieSchema, "404": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
     @requires_auth('update:movies', auth_enabled)
+    @invalidates(ASSOCIATIONS)
     def delete_association(form: ActorMovieDeleteSchema):
         """Deletes an actor-movie association.
         
@@ -260,12 +606,75 @@ def create_app():
             abort(404)   
         try:
             session.delete(actor_movie)
+            refresh_projections(session, actor_ids=[form.actor_id], movie_ids=[form.movie_id])
             session.commit()            
             return ActorMovieRepresentation(actor_movie), 200
         except Exception as e:
             #logger.error(e)
             abort(422)
 
+    @app.post('/api/v1/actor-movie/bulk', tags=[actor_movies_tag], responses={"200": BulkResultSchema, "413": ErrorSchema, "422": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth('update:movies', auth_enabled)
+    @invalidates(ASSOCIATIONS)
+    def create_associations(body: ActorMovieBulkAddSchema):
+        """Creates several associations at once.
+        
+        Arguments:
+            associations: list of associations' data (at most BULK_MAX_ITEMS).
+        
+        Returns the per-item results: the associations created, and the reason why the others were not.
+        """
+        if len(body.associations) > BULK_MAX_ITEMS:
+            abort(413)
+        session = Session()
+        rows, results = BulkValidate(body.associations, ActorMovieSchema)
+        try:
+            insert_associations(session, rows, results)
+            session.commit()
+        except Exception as e:
+            #logger.error(e)
+            # the batches inserted before the failure are not kept
+            session.rollback()
+            abort(422)
+        return BulkResultRepresentation(results), 200
+
+    #
+    # Endpoints (batch)
+    #
+    @app.post('/api/v1/batch', tags=[batch_tag], responses={"200": BatchResultSchema, "413": ErrorSchema}, security=[{"jwt": []}] if auth_enabled else None)
+    @requires_auth(None, auth_enabled)
+    def batch(body: BatchSchema):
+        """Runs several write operations in a single transaction.
+        
+        Arguments:
+            operations: list of operations (method, path, and JSON body or form fields) mapping onto
+                the endpoints above (at most BULK_MAX_ITEMS), each one requiring its endpoint's permission.
+            atomic: whether the first failed operation rolls back the whole batch (default) or only itself.
+        
+        Returns the per-operation results (status and body), and whether they were committed.
+        """
+        if len(body.operations) > BULK_MAX_ITEMS:
+            abort(413)
+        results, committed = run_batch(body.operations, body.atomic)
+        return BatchResultRepresentation(results, committed), 200
+
+    #
+    # Commands
+    #
+    @app.cli.command('rebuild-projections')
+    def rebuild_projections_command():
+        """Recomputes the denormalized filmographies and casts of all the actors and movies.
+
+        Needed after writes made outside of the API (e.g. SQL scripts), which do not maintain them.
+        """
+        try:
+            actors, movies = rebuild_projections(Session())
+        finally:
+            Session.remove()
+        # drops the responses built from the previous projections
+        bump(ACTORS, MOVIES, ASSOCIATIONS)
+        click.echo(f'Rebuilt the filmography of {actors} actors and the cast of {movies} movies.')
+
     #
     # Error handlers
     #
@@ -281,6 +690,10 @@ def create_app():
     def not_found(error):
         return ErrorRepresentation('Resource not found.'), 404
 
+    @app.errorhandler(413)
+    def too_large(error):
+        return ErrorRepresentation(f'Too many items (at most {BULK_MAX_ITEMS} are accepted).'), 413
+
     @app.errorhandler(422)
     def unprocessable(error):
         return ErrorRepresentation('Processing of request failed.'), 422
@@ -295,13 +708,22 @@ def create_app():
     
     
     return app
- 
- 
-app = create_app()
+
+#
+# Application instance (e.g. 'gunicorn app:app'), created on first access
+#
+_app = None
+
+def __getattr__(name):
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module 'app' has no attribute '{name}'")
 
 #
 # Main program
 # 
 if __name__ == '__main__':
-    app = create_app()
-    app.run()
+    create_app().run()
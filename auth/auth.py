@@ -1,15 +1,67 @@
 import os
-import json
-from flask import request
+import time
+from flask import current_app, g, request
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from auth.jwks import JWKSKeyStore
+from auth.token_cache import TokenCache
+from utils.metrics import jwt_verification_duration, jwt_token_cache, record_jwks_fetch
 
 
 AUTH0_DOMAIN = os.environ.get("AUTH0_DOMAIN")
 ALGORITHMS = [os.environ.get("ALGORITHMS")]
 API_AUDIENCE = os.environ.get("API_AUDIENCE")
 
+# JWKS location: defaults to the Auth0 tenant, but may point to a local file/URL (e.g. a test stand-in)
+JWKS_URL = os.environ.get("JWKS_URL") or f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
+JWKS_CACHE_TTL = int(os.environ.get("JWKS_CACHE_TTL", 600))
+JWKS_STALE_TTL = int(os.environ.get("JWKS_STALE_TTL", 3600))
+JWKS_MIN_REFRESH_INTERVAL = int(os.environ.get("JWKS_MIN_REFRESH_INTERVAL", 30))
+
+# verified token cache (TOKEN_CACHE_ENABLED=0 disables it)
+TOKEN_CACHE_ENABLED = os.environ.get("TOKEN_CACHE_ENABLED") != '0'
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 1024))
+TOKEN_CACHE_MAX_TTL = int(os.environ.get("TOKEN_CACHE_MAX_TTL", 300))
+
+#
+# Token issuer of an application
+#
+class AuthSettings:
+    """ The token issuer settings of an application, along with its key and verified token caches.
+    """
+
+    def __init__(self, domain=None, audience=None, algorithms=None, jwks_url=None):
+        """
+        Initializes the settings (overriding the environment variables).
+
+        Arguments:
+            domain: Auth0 tenant domain (AUTH0_DOMAIN).
+            audience: API audience (API_AUDIENCE).
+            algorithms: list of accepted signing algorithms (ALGORITHMS).
+            jwks_url: JWKS location (JWKS_URL), by default the tenant's.
+        """
+        self.domain = domain or AUTH0_DOMAIN
+        self.audience = audience or API_AUDIENCE
+        self.algorithms = algorithms or ALGORITHMS
+        self.jwks_url = jwks_url or (f'https://{domain}/.well-known/jwks.json' if domain else JWKS_URL)
+        self.jwks_store = JWKSKeyStore(self.jwks_url, ttl=JWKS_CACHE_TTL, stale_ttl=JWKS_STALE_TTL, min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL, on_fetch=record_jwks_fetch)
+        self.token_cache = TokenCache(max_size=TOKEN_CACHE_SIZE, enabled=TOKEN_CACHE_ENABLED, max_ttl=TOKEN_CACHE_MAX_TTL)
+
+def configure(app, domain=None, audience=None, algorithms=None, jwks_url=None):
+    """ Sets the token issuer of an application (see AuthSettings), with empty key and token caches.
+    """
+    app.extensions['auth'] = AuthSettings(domain, audience, algorithms, jwks_url)
+    return app.extensions['auth']
+
+def get_settings():
+    """ Returns the token issuer settings of the current application (by default, read from the environment).
+    """
+    settings = current_app.extensions.get('auth')
+    if settings is None:
+        settings = current_app.extensions['auth'] = AuthSettings()
+    return settings
+
 #
 # Authentication Exception
 #
@@ -45,37 +97,63 @@ def check_permissions(permission, payload):
 #  Decode JWT
 #
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    # jwks contains the public keys of the issuer
-    jwks = json.loads(jsonurl.read())  
-    header = jwt.get_unverified_header(token) 
-    rsa_key = {}
+    try:
+        header = jwt.get_unverified_header(token) 
+    except Exception as e:
+        raise AuthError(f'error processing token: {str(e)}', 400)
     if not 'kid' in header:
         raise AuthError('key id missing.', 401)
-    for k in jwks['keys']:
-        if k['kid'] == header['kid']:
-            rsa_key = { 'kty': k['kty'], 'kid': k['kid'], 'use': k['use'],'n': k['n'],'e': k['e']}
-            break
+    settings = get_settings()
+    # the key store holds the public keys of the issuer
+    rsa_key = settings.jwks_store.get_key(header['kid'])
     if rsa_key:
         try:
-            payload = jwt.decode(token, rsa_key, audience=API_AUDIENCE, issuer=f'https://{AUTH0_DOMAIN}/', algorithms=ALGORITHMS)
+            payload = jwt.decode(token, rsa_key, audience=settings.audience, issuer=f'https://{settings.domain}/', algorithms=settings.algorithms)
         except Exception as e:
             raise AuthError(f'error processing token: {str(e)}', 400)
     else:
         raise AuthError('could not find key', 400)
     return payload
 
+#
+# Verify the token of the current request
+#
+def authenticate():
+    """ Returns the payload of the request's bearer token.
+
+    The token is verified once per request: the payload is then kept in g, so that
+    the operations of a batch request check their permissions against it.
+    """
+    payload = g.get('auth_payload')
+    if payload is None:
+        token = get_token_auth_header()
+        token_cache = get_settings().token_cache
+        # repeat tokens skip the signature verification
+        payload = token_cache.get(token)
+        jwt_token_cache.labels('hit' if payload is not None else 'miss').inc()
+        if payload is None:
+            start = time.perf_counter()
+            try:
+                payload = verify_decode_jwt(token)
+            finally:
+                jwt_verification_duration.observe(time.perf_counter() - start)
+            token_cache.put(token, payload)
+        g.auth_payload = payload
+    return payload
+
 #
 # @requires_auth() decorator method
 #
 def requires_auth(permission='', enabled=True):
+    """ Requires a valid token granting the given permission (any valid token when None).
+    """
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
             if (enabled):
-                token = get_token_auth_header()
-                payload = verify_decode_jwt(token)
-                check_permissions(permission, payload)
+                payload = authenticate()
+                if permission is not None:
+                    check_permissions(permission, payload)
             return f(*args, **kwargs)
         return wrapper
     return requires_auth_decorator
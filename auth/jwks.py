@@ -0,0 +1,180 @@
+import json
+import logging
+import re
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+#
+# Parses the max-age directive of a Cache-Control header
+#
+def parse_max_age(cache_control):
+    """ Returns the max-age (in seconds) of a Cache-Control header value.
+
+    Returns 0 for 'no-cache'/'no-store', and None if no directive applies.
+    """
+    if not cache_control:
+        return None
+    directives = cache_control.lower()
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+    match = re.search(r'(?:^|[,\s])max-age\s*=\s*"?(\d+)"?', directives)
+    if match is None:
+        return None
+    return int(match.group(1))
+
+#
+# JSON Web Key Set store
+#
+class JWKSKeyStore:
+    """ Process-wide cache of the issuer's JSON Web Key Set.
+
+    Keys are kept for the TTL advertised by the Cache-Control header of the
+    JWKS response (or 'ttl' when it is missing). Once expired, the stale key
+    set keeps being served for up to 'stale_ttl' seconds while a background
+    thread fetches a fresh copy. Unknown key ids (or a missing key set) trigger
+    a synchronous refresh, at most once every 'min_refresh_interval' seconds:
+    the requests arriving during a fetch wait for its outcome instead of
+    fetching the key set again.
+    """
+
+    def __init__(self, url, ttl=600, stale_ttl=3600, min_refresh_interval=30, timeout=5, on_fetch=None):
+        """
+        Initializes the key store.
+
+        Arguments:
+            url: JWKS location (https://, http://, file:// or a local path).
+            ttl: default time to live of the key set, in seconds.
+            stale_ttl: how long an expired key set may still be served while revalidating.
+            min_refresh_interval: minimum number of seconds between two fetches.
+            timeout: network timeout of a fetch, in seconds.
+            on_fetch: optional function called after each fetch with its outcome (True if it succeeded) and duration in seconds.
+        """
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.on_fetch = on_fetch
+        self._keys = None
+        self._expires_at = 0.0
+        self._last_fetch = None
+        self._lock = threading.Lock()
+        # held during each fetch (so that there is at most one at a time)
+        self._fetch_lock = threading.RLock()
+        self._refreshing = False
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def _read(self):
+        """ Reads the JWKS document, returning its keys and TTL.
+        """
+        parsed = urlparse(self.url)
+        if parsed.scheme in ('http', 'https', 'file'):
+            with urlopen(self.url, timeout=self.timeout) as response:
+                jwks = json.loads(response.read())
+                max_age = parse_max_age(response.headers.get('Cache-Control')) if parsed.scheme != 'file' else None
+        else:
+            with open(self.url, 'r') as f:
+                jwks = json.loads(f.read())
+                max_age = None
+        keys = {}
+        for k in jwks['keys']:
+            if 'kid' in k:
+                keys[k['kid']] = { 'kty': k['kty'], 'kid': k['kid'], 'use': k.get('use'), 'n': k['n'], 'e': k['e']}
+        return keys, self.ttl if max_age is None else max_age
+
+    def refresh(self):
+        """ Fetches the key set, keeping the previous one if the fetch fails.
+
+        Returns True if the key set was updated.
+        """
+        with self._fetch_lock:
+            with self._lock:
+                self._last_fetch = time.monotonic()
+                self.fetches += 1
+            start = time.perf_counter()
+            try:
+                keys, ttl = self._read()
+            except Exception as e:
+                with self._lock:
+                    self.fetch_errors += 1
+                logger.warning(f'Could not fetch JWKS from {self.url}: {e}')
+                if self.on_fetch:
+                    self.on_fetch(False, time.perf_counter() - start)
+                return False
+            if self.on_fetch:
+                self.on_fetch(True, time.perf_counter() - start)
+            with self._lock:
+                self._keys = keys
+                self._expires_at = time.monotonic() + ttl
+            return True
+
+    def _refresh_once(self, last_fetch):
+        """ Refreshes the key set, unless it was fetched since last_fetch (e.g. by a concurrent
+        request, whose outcome is then used) or less than 'min_refresh_interval' seconds ago.
+        """
+        with self._fetch_lock:
+            with self._lock:
+                if self._last_fetch != last_fetch or not self._can_refresh(time.monotonic()):
+                    return
+            self.refresh()
+
+    def _refresh_in_background(self):
+        """ Refreshes the key set in a daemon thread, unless one is already running.
+        """
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name='jwks-refresh', daemon=True).start()
+
+    def _can_refresh(self, now):
+        return self._last_fetch is None or now - self._last_fetch >= self.min_refresh_interval
+
+    def get_key(self, kid):
+        """ Returns the RSA key with the given key id, or None if the issuer does not know it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            keys = self._keys
+            expires_at = self._expires_at
+            last_fetch = self._last_fetch
+            can_refresh = self._can_refresh(now)
+
+        if keys is None or now >= expires_at + self.stale_ttl:
+            # nothing usable is cached: the caller has to wait for the fetch
+            self._refresh_once(last_fetch)
+        elif now >= expires_at and can_refresh:
+            # stale-while-revalidate
+            self._refresh_in_background()
+
+        with self._lock:
+            keys = self._keys or {}
+            last_fetch = self._last_fetch
+        if kid in keys:
+            return keys[kid]
+
+        # the issuer may have rotated its keys since the last fetch
+        self._refresh_once(last_fetch)
+        with self._lock:
+            return (self._keys or {}).get(kid)
+
+    def clear(self):
+        """ Drops the cached key set.
+        """
+        with self._lock:
+            self._keys = None
+            self._expires_at = 0.0
+            self._last_fetch = None
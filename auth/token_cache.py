@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+#
+# Verified token cache
+#
+class TokenCache:
+    """ Bounded LRU cache of verified JWT payloads.
+
+    Entries are keyed by a SHA-256 digest of the raw token (the token itself
+    is never stored) and are dropped once the token's 'exp' claim is reached,
+    or after 'max_ttl' seconds (whichever comes first, so that tokens without
+    'exp' are not kept forever).
+    """
+
+    def __init__(self, max_size=1024, enabled=True, max_ttl=300):
+        """
+        Initializes the cache.
+
+        Arguments:
+            max_size: maximum number of cached tokens.
+            enabled: whether the cache is used at all.
+            max_ttl: maximum number of seconds a token is cached.
+        """
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.enabled = enabled and max_size > 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """ Returns the cached payload of a token, or None.
+        """
+        if not self.enabled:
+            return None
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if time.time() >= expires_at:
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+            self.misses += 1
+            return None
+
+    def put(self, token, payload):
+        """ Caches the payload of a verified token.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        exp = payload.get('exp')
+        expires_at = now + self.max_ttl if exp is None else min(exp, now + self.max_ttl)
+        if now >= expires_at:
+            return
+        key = self._digest(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """ Drops all cached tokens and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ Returns the cache counters.
+        """
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,115 @@
+"""
+
+Serialization benchmark: compares the time taken by the JSON providers (Flask's
+default one, based on the standard library, and the orjson-based one) to encode
+the responses of the list endpoints, and checks that they produce the same bytes.
+
+The payloads are pages of actors and movies shaped like the API's representations
+(dates, and filmographies or casts), built in memory.
+
+$ python benchmarks/serialization.py --items 1000 --repeat 50
+
+"""
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.serialization import FastJSONProvider
+
+FIRST_NAMES = ['Maria', 'João', 'Yuki', 'Chloé', 'James', 'Sofia', 'Lucas', 'Zoë']
+LAST_NAMES = ['Silva', 'Tanaka', 'Dubois', 'Smith', 'Rossi', 'Müller', 'Santos', 'Kim']
+WORDS = ['Dark', 'River', 'Night', 'Empire', 'Return', 'Lost', 'King', 'Dream']
+
+#
+# Payloads
+#
+def random_date(rng, first_year, last_year):
+    return datetime.date(rng.randint(first_year, last_year), rng.randint(1, 12), rng.randint(1, 28))
+
+def actors_page(rng, n, mean_cast):
+    """ Returns the representation of a page of n actors, with their filmographies.
+    """
+    return {
+        "actors": [{
+            "id": i + 1,
+            "name": f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1}',
+            "gender": rng.choice(['Female', 'Male']),
+            "birth_date": random_date(rng, 1930, 2005),
+            "nationality": rng.choice(['Brazilian', 'French', 'Japanese', 'American']),
+            "assocations": [[m, f'{rng.choice(WORDS)} {rng.choice(WORDS)} {m}', f'Character {k + 1}'] for k, m in enumerate(rng.sample(range(1, 100000), rng.randint(0, 2 * mean_cast)))]
+        } for i in range(n)],
+        "next_cursor": 'eyJpZCI6MTAwMH0'
+    }
+
+def movies_page(rng, n, mean_cast):
+    """ Returns the representation of a page of n movies, with their casts.
+    """
+    return {
+        "movies": [{
+            "id": i + 1,
+            "title": f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i + 1}',
+            "genre": rng.choice(['Drama', 'Comedy', 'Science Fiction', 'Fantasy']),
+            "release_date": random_date(rng, 1950, 2023),
+            "assocations": [[a, f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {a}', f'Character {k + 1}'] for k, a in enumerate(rng.sample(range(1, 100000), rng.randint(0, 2 * mean_cast)))]
+        } for i in range(n)],
+        "next_cursor": None
+    }
+
+#
+# Measures
+#
+def measure(provider, payload, repeat):
+    """ Returns the response body of a payload, and the times taken to encode it, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = provider.response(payload).get_data()
+        timings.append(time.perf_counter() - started)
+    return body, timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the JSON providers on list responses.')
+    parser.add_argument('--items', type=int, default=1000, help='items per page (default: 1000)')
+    parser.add_argument('--cast', type=int, default=5, help='mean number of associations per item (default: 5)')
+    parser.add_argument('--repeat', type=int, default=30, help='encodings of each payload (default: 30)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default: 1)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {'stdlib': DefaultJSONProvider(app), 'orjson': FastJSONProvider(app)}
+    for provider in providers.values():
+        # as set by create_app
+        provider.sort_keys = False
+    rng = random.Random(args.seed)
+    payloads = {'actors': actors_page(rng, args.items, args.cast), 'movies': movies_page(rng, args.items, args.cast)}
+
+    print(f'{"payload":<10}{"provider":<10}{"bytes":>10}{"median (ms)":>14}{"min (ms)":>12}{"speedup":>10}')
+    with app.app_context():
+        for name, payload in payloads.items():
+            bodies = {}
+            medians = {}
+            for provider_name, provider in providers.items():
+                # the first encoding warms up the caches and is not reported
+                provider.response(payload)
+                bodies[provider_name], timings = measure(provider, payload, args.repeat)
+                medians[provider_name] = statistics.median(timings)
+                speedup = f'{medians["stdlib"] / medians[provider_name]:.1f}x'
+                print(f'{name:<10}{provider_name:<10}{len(bodies[provider_name]):>10}{medians[provider_name] * 1000:>14.2f}{min(timings) * 1000:>12.2f}{speedup:>10}')
+            if bodies['orjson'] != bodies['stdlib']:
+                sys.exit(f'The providers encode the {name} payload differently')
+    print('Both providers produce the same bytes.')
+
+if __name__ == '__main__':
+    main()
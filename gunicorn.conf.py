@@ -0,0 +1,36 @@
+import glob
+import os
+import tempfile
+
+from prometheus_client import multiprocess
+
+#
+# Shared ETag versions and response cache: unless CACHE_BACKEND_URL is set, the workers keep them in a
+# SQLite file of their own server (the in-memory backend would only be invalidated by the writes each
+# worker serves itself, so that the others would answer with stale responses)
+#
+CACHE_BACKEND_PATH = os.path.join(tempfile.gettempdir(), f'fsnd_capstone_cache_{os.getpid()}.db')
+os.environ.setdefault('CACHE_BACKEND_URL', f'sqlite:///{CACHE_BACKEND_PATH}')
+
+#
+# Prometheus multiprocess mode: each worker writes its metrics to PROMETHEUS_MULTIPROC_DIR,
+# and /metrics aggregates the files of all the workers
+#
+def on_starting(server):
+    # metrics left over by a previous run would be aggregated as well
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+    if os.environ['CACHE_BACKEND_URL'] in ('', 'memory://') and server.cfg.workers > 1:
+        server.log.warning('CACHE_BACKEND_URL=memory:// with several workers: the ETags and cached responses of a worker are not invalidated by the writes of the others')
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    # the cache file (and its WAL files) only holds the versions and responses of this run
+    for path in glob.glob(f'{CACHE_BACKEND_PATH}*'):
+        os.remove(path)
@@ -0,0 +1,53 @@
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+# (importing the model package registers all the tables on Base.metadata)
+from model import normalize_url
+from model.base import Base
+
+# Alembic Config object, which provides access to the values within the .ini file in use
+config = context.config
+
+# sets up the loggers
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# metadata of the models, used by 'autogenerate'
+target_metadata = Base.metadata
+
+def database_url():
+    """ Returns the database URL, read from the environment (as the application does).
+    """
+    return normalize_url(config.get_main_option('sqlalchemy.url') or os.environ['DATABASE_URL'])
+
+def include_object(object, name, type_, reflected, compare_to):
+    """ Leaves out of 'autogenerate' the indexes declared for other database systems (see model/search.py).
+    """
+    ddl_if = getattr(object, '_ddl_if', None)
+    if type_ == 'index' and not reflected and ddl_if is not None and ddl_if.dialect is not None:
+        return ddl_if.dialect == context.get_context().dialect.name
+    return True
+
+def run_migrations_offline() -> None:
+    """ Emits the migrations as SQL script, without connecting to the database.
+    """
+    context.configure(url=database_url(), target_metadata=target_metadata, include_object=include_object, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """ Runs the migrations against the database.
+    """
+    connectable = create_engine(database_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
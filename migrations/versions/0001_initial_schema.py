@@ -0,0 +1,61 @@
+"""Initial schema: actor, movie and actor_movie_association tables
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # databases created by the earlier versions of the application (which created the tables with Base.metadata.create_all
+    # when it started) already hold these tables: they are left as they are, and brought up to date by the next revisions
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'actor' not in existing_tables:
+        op.create_table(
+            'actor',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('gender', sa.String(), nullable=True),
+            sa.Column('birth_date', sa.Date(), nullable=True),
+            sa.Column('nationality', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id', name='actor_pkey'),
+            sa.UniqueConstraint('name', name='actor_name_key')
+        )
+    if 'movie' not in existing_tables:
+        op.create_table(
+            'movie',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('title', sa.String(), nullable=True),
+            sa.Column('genre', sa.String(), nullable=True),
+            sa.Column('release_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('id', name='movie_pkey'),
+            sa.UniqueConstraint('title', name='movie_title_key')
+        )
+    if 'actor_movie_association' not in existing_tables:
+        op.create_table(
+            'actor_movie_association',
+            sa.Column('actor_id', sa.Integer(), nullable=False),
+            sa.Column('movie_id', sa.Integer(), nullable=False),
+            sa.Column('character_name', sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(['actor_id'], ['actor.id'], name='actor_movie_association_actor_id_fkey'),
+            sa.ForeignKeyConstraint(['movie_id'], ['movie.id'], name='actor_movie_association_movie_id_fkey'),
+            sa.PrimaryKeyConstraint('actor_id', 'movie_id', name='actor_movie_association_pkey')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('actor_movie_association')
+    op.drop_table('movie')
+    op.drop_table('actor')
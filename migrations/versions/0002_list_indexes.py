@@ -0,0 +1,40 @@
+"""Indexes for the association lookups by movie and the list filters and sort orders
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table and columns of each index
+INDEXES = [
+    ('ix_actor_movie_association_movie_id', 'actor_movie_association', ['movie_id']),
+    ('ix_actor_gender', 'actor', ['gender', 'id']),
+    ('ix_actor_nationality', 'actor', ['nationality', 'id']),
+    ('ix_actor_birth_date', 'actor', ['birth_date', 'id']),
+    ('ix_actor_gender_birth_date', 'actor', ['gender', 'birth_date', 'id']),
+    ('ix_actor_nationality_birth_date', 'actor', ['nationality', 'birth_date', 'id']),
+    ('ix_movie_genre', 'movie', ['genre', 'id']),
+    ('ix_movie_release_date', 'movie', ['release_date', 'id']),
+    ('ix_movie_genre_release_date', 'movie', ['genre', 'release_date', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
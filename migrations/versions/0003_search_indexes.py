@@ -0,0 +1,44 @@
+"""Search indexes on actor names and movie titles
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# searched table and column pairs (see model/search.py)
+COLUMNS = [('actor', 'name'), ('movie', 'title')]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, column in COLUMNS:
+            op.create_index(f'ix_{table}_{column}_fts', table, [sa.text(f"to_tsvector('simple', {column})")], postgresql_using='gin', if_not_exists=True)
+            op.create_index(f'ix_{table}_{column}_trgm', table, [sa.text(f'{column} gin_trgm_ops')], postgresql_using='gin', if_not_exists=True)
+            op.create_index(f'ix_{table}_{column}_prefix', table, [sa.text(f'(lower({column}) COLLATE "C")')], if_not_exists=True)
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table, column in COLUMNS:
+            op.create_index(f'ix_{table}_{column}_lower', table, [sa.text(f'lower({column})')], if_not_exists=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in COLUMNS:
+            op.drop_index(f'ix_{table}_{column}_prefix', table_name=table)
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
+            op.drop_index(f'ix_{table}_{column}_fts', table_name=table)
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table, column in COLUMNS:
+            op.drop_index(f'ix_{table}_{column}_lower', table_name=table)
@@ -0,0 +1,48 @@
+"""Denormalized actor filmographies and movie casts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table, projection column, association key, other table, its key and its label (see model/projections.py)
+PROJECTIONS = [
+    ('actor', 'filmography', 'actor_id', 'movie', 'movie_id', 'title'),
+    ('movie', 'cast', 'movie_id', 'actor', 'actor_id', 'name'),
+]
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    association = sa.table('actor_movie_association', sa.column('actor_id'), sa.column('movie_id'), sa.column('character_name'))
+    for table, column, key, other_table, other_key, label in PROJECTIONS:
+        op.add_column(table, sa.Column(column, sa.JSON(), server_default='[]', nullable=False))
+        # backfills the projections of the existing rows
+        other = sa.table(other_table, sa.column('id'), sa.column(label))
+        rows = connection.execute(sa.select(association.c[key], association.c[other_key], other.c[label], association.c.character_name)
+                                  .join(other, other.c.id == association.c[other_key])
+                                  .order_by(association.c[key], association.c[other_key]))
+        projections = {}
+        for id, other_id, other_label, character_name in rows:
+            projections.setdefault(id, []).append([other_id, other_label, character_name])
+        if projections:
+            target = sa.table(table, sa.column('id'), sa.column(column, sa.JSON()))
+            connection.execute(target.update().where(target.c.id == sa.bindparam('_id')).values({column: sa.bindparam('_projection')}),
+                               [{'_id': id, '_projection': projection} for id, projection in projections.items()])
+
+
+def downgrade() -> None:
+    for table, column, *_ in reversed(PROJECTIONS):
+        op.drop_column(table, column)
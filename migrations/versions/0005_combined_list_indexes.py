@@ -0,0 +1,34 @@
+"""Indexes for the actor lists filtered by both gender and nationality, or by one of them and sorted by the other
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table and columns of each index
+INDEXES = [
+    ('ix_actor_gender_nationality', 'actor', ['gender', 'nationality', 'id']),
+    ('ix_actor_nationality_gender', 'actor', ['nationality', 'gender', 'id']),
+    ('ix_actor_gender_nationality_birth_date', 'actor', ['gender', 'nationality', 'birth_date', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -1,20 +1,152 @@
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy import create_engine
+from contextlib import contextmanager
+from flask import current_app
 import os
+import threading
 
 from model.base import Base
 from model.actor_movie import actor_movie_association, ActorMovieAssociation
 from model.actor import Actor
 from model.movie import Movie
+from model.pool import pool_options, pool_statistics, instrument_pool
+from model.queries import instrument_queries
+from model.replicas import ReplicaSet, RoutingSession, read_only, replica_client
+
+def normalize_url(url):
+    """ Returns a database URL usable by SQLAlchemy (Heroku still hands out 'postgres://' URLs).
+    """
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+#
+# Database of an application
+#
+class Database:
+    """ The database of an application: its engine (created when first used), read replicas and sessions.
+    """
+
+    def __init__(self, database_url=None, replica_urls=None, **engine_options):
+        """
+        Initializes the database settings.
+
+        Arguments:
+            database_url: database URL (by default, read from the DATABASE_URL environment variable).
+            replica_urls: URLs of the read replicas (by default, comma-separated in DATABASE_REPLICA_URLS).
+            engine_options: options of create_engine overriding the pool settings (e.g. poolclass, creator).
+        """
+        self.database_url = database_url
+        self.engine_options = engine_options
+        self._engine = None
+        self._lock = threading.Lock()
+        # the reads of the read-only handlers go to the replicas
+        if replica_urls is None:
+            replica_urls = os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+        replica_urls = [url.strip() for url in replica_urls if url.strip()]
+        self.replicas = ReplicaSet(replica_urls, self._create_engine) if replica_urls else None
+        self.session_factory = sessionmaker(class_=RoutingSession, replicas=self.replicas)
+
+    def _create_engine(self, database_url):
+        database_url = normalize_url(database_url)
+        engine = create_engine(database_url, echo=False, **{**pool_options(database_url), **self.engine_options})
+        instrument_pool(engine)
+        instrument_queries(engine)
+        return engine
+
+    @property
+    def engine(self):
+        """ The database engine, created on first use (pool settings are read from the environment).
+        """
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._create_engine(self.database_url or os.environ['DATABASE_URL'])
+        return self._engine
+
+    def session(self, **kwargs):
+        """ Returns a new session of the database.
+        """
+        return self.session_factory(bind=self.engine, **kwargs)
+
+    def pool_status(self):
+        """ Returns the connection pool statistics, along with the health of the read replicas.
+        """
+        status = {"pool": self.engine.pool.status(), **pool_statistics.snapshot()}
+        if self.replicas is not None:
+            status["replicas"] = self.replicas.status()
+        return status
+
+    def dispose(self):
+        """ Closes the connections of the engines, if any.
+        """
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            if self.replicas is not None:
+                self.replicas.dispose()
+
+def configure(app, database_url=None, replica_urls=None, **engine_options):
+    """ Sets the database of an application (see Database), disposing of the previous one, if any.
+
+    The engines are only created when the databases are first used.
+    """
+    previous = app.extensions.get('database')
+    if previous is not None:
+        previous.dispose()
+    app.extensions['database'] = Database(database_url, replica_urls, **engine_options)
+    return app.extensions['database']
+
+def get_database():
+    """ Returns the database of the current application.
+    """
+    return current_app.extensions['database']
+
+def get_engine():
+    """ Returns the database engine of the current application.
+    """
+    return get_database().engine
+
+def reads_may_be_stale():
+    """ Returns whether the reads of the current request may come from a replica which has not replayed a recent write yet.
+    """
+    replicas = get_database().replicas
+    return replicas is not None and replicas.may_be_stale(replica_client.get())
+
+# sessions are scoped to the current thread, i.e. to the request being served, and bound to the database of its application
+# (the schema is managed by the Alembic migrations: 'alembic upgrade head')
+# (the reads of the read-only handlers go to a replica, see model/replicas.py)
+Session = scoped_session(lambda: get_database().session())
+
+@contextmanager
+def transaction():
+    """ Runs a block in a single database transaction, which the block commits (or not).
+
+    Within the block, the current thread's session is bound to the transaction's connection:
+    its commits only release savepoints, and its rollbacks only roll back to them. The
+    transaction is rolled back unless committed by the block.
+    """
+    Session.remove()
+    database = get_database()
+    with database.engine.connect() as connection:
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            # pysqlite ends its transaction when the first savepoint is released: BEGIN is emitted here instead
+            dbapi_connection = connection.connection.dbapi_connection
+            isolation_level, dbapi_connection.isolation_level = dbapi_connection.isolation_level, None
+        transaction = connection.begin()
+        if sqlite:
+            connection.exec_driver_sql('BEGIN')
+        session = database.session_factory(bind=connection, join_transaction_mode='create_savepoint')
+        # the reads of the block see its writes
+        session.info['primary'] = True
+        Session.registry.set(session)
+        try:
+            yield transaction
+        finally:
+            Session.remove()
+            if transaction.is_active:
+                transaction.rollback()
+            if sqlite:
+                dbapi_connection.isolation_level = isolation_level
 
-# reads the database path from the environment
-database_path = os.environ['DATABASE_URL']
-if database_path.startswith("postgres://"):
-  database_path = database_path.replace("postgres://", "postgresql://", 1)
-  
-# creates a PostgreSQL database engine
-engine = create_engine(database_path, echo=False)
-
-# initializes the database
-Session = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
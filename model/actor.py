@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Date, Index, JSON
+from sqlalchemy.orm import relationship, deferred
 from model.base import Base
+from model.search import search_indexes
 from model.actor_movie import actor_movie_association
 
 #
@@ -8,12 +9,29 @@ from model.actor_movie import actor_movie_association
 #
 class Actor(Base):
     __tablename__ = 'actor'
+    # indexes backing the list filters and sort orders (id last, as the keyset tie-breaker):
+    # any combination of the gender and nationality filters, sorted by any field (birth_date ranges require
+    # sorting by birth_date, see SortOrder)
+    __table_args__ = (
+        Index('ix_actor_gender', 'gender', 'id'),
+        Index('ix_actor_nationality', 'nationality', 'id'),
+        Index('ix_actor_birth_date', 'birth_date', 'id'),
+        Index('ix_actor_gender_birth_date', 'gender', 'birth_date', 'id'),
+        Index('ix_actor_nationality_birth_date', 'nationality', 'birth_date', 'id'),
+        Index('ix_actor_gender_nationality', 'gender', 'nationality', 'id'),
+        Index('ix_actor_nationality_gender', 'nationality', 'gender', 'id'),
+        Index('ix_actor_gender_nationality_birth_date', 'gender', 'nationality', 'birth_date', 'id'),
+        # search by name (see model/search.py)
+        *search_indexes('actor', 'name'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True)
     gender = Column(String, unique=False)
     birth_date = Column(Date, unique=False)
     nationality = Column(String, unique=False)
+    # denormalized associations ([movie id, title, character name] triples, see model/projections.py), only loaded when requested
+    filmography = deferred(Column(JSON, nullable=False, default=list, server_default='[]'))
     associations = relationship('ActorMovieAssociation', back_populates='actors')
     movies = relationship('Movie', secondary=actor_movie_association, back_populates='actors', overlaps="actors, movies, associations")
             
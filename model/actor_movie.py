@@ -1,4 +1,4 @@
-from sqlalchemy import Table, ForeignKey, Column, Integer, String
+from sqlalchemy import Table, ForeignKey, Column, Integer, String, Index
 from sqlalchemy.orm import relationship
 from model.base import Base
 
@@ -10,7 +10,9 @@ actor_movie_association = Table(
     Base.metadata,
     Column('actor_id', Integer, ForeignKey('actor.id'), primary_key=True),
     Column('movie_id', Integer, ForeignKey('movie.id'), primary_key=True),
-    Column('character_name', String, unique=False, nullable=False)
+    Column('character_name', String, unique=False, nullable=False),
+    # the primary key serves the lookups by actor, this index the lookups by movie
+    Index('ix_actor_movie_association_movie_id', 'movie_id')
 )
 
 #
@@ -0,0 +1,91 @@
+import os
+from sqlalchemy import insert, select, tuple_
+
+from model.actor import Actor
+from model.movie import Movie
+from model.actor_movie import ActorMovieAssociation
+from model.projections import refresh_projections
+
+# maximum number of items accepted by a bulk request
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 1000))
+
+# rows per INSERT statement (keeps the number of bound parameters under the database limits)
+INSERT_BATCH_SIZE = 500
+
+def _batches(rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        yield rows[start:start + INSERT_BATCH_SIZE]
+
+#
+# Bulk inserts
+#
+def _insert(session, model, key, rows, results):
+    """ Inserts rows with multi-row INSERT statements, recording the id of each created row.
+
+    Arguments:
+        model: the mapped class (Actor or Movie).
+        key: the unique column (name or title).
+        rows: list of (index, values) pairs.
+        results: per-item results, indexed like the request items.
+
+    The rows are inserted in several statements: if one of them fails, the caller
+    rolls back the session, so that the batches inserted before are not kept.
+    """
+    # unique values already taken, either in the database or earlier in the batch
+    values = [v[key] for _, v in rows]
+    column = getattr(model, key)
+    taken = set(session.scalars(select(column).where(column.in_(values)))) if values else set()
+    accepted = []
+    for index, v in rows:
+        if v[key] in taken:
+            results[index] = {"index": index, "error": f'{key} already exists.'}
+        else:
+            taken.add(v[key])
+            accepted.append((index, v))
+    if not accepted:
+        return
+    # multi-row INSERTs; the returned ids are matched to the items through the unique column
+    created = {}
+    for batch in _batches(accepted):
+        created.update((value, id) for id, value in session.execute(insert(model).values([v for _, v in batch]).returning(model.id, column)))
+    for index, v in accepted:
+        results[index] = {"index": index, "id": created[v[key]]}
+
+def insert_actors(session, rows, results):
+    """ Inserts actors, skipping (and reporting) duplicate names.
+    """
+    _insert(session, Actor, 'name', rows, results)
+
+def insert_movies(session, rows, results):
+    """ Inserts movies, skipping (and reporting) duplicate titles.
+    """
+    _insert(session, Movie, 'title', rows, results)
+
+def insert_associations(session, rows, results):
+    """ Inserts actor-movie associations, skipping (and reporting) unknown actors/movies and existing associations,
+    and refreshes the filmographies and casts they change.
+    """
+    actor_ids = {v['actor_id'] for _, v in rows}
+    movie_ids = {v['movie_id'] for _, v in rows}
+    pairs = {(v['actor_id'], v['movie_id']) for _, v in rows}
+    known_actors = set(session.scalars(select(Actor.id).where(Actor.id.in_(actor_ids)))) if actor_ids else set()
+    known_movies = set(session.scalars(select(Movie.id).where(Movie.id.in_(movie_ids)))) if movie_ids else set()
+    keys = tuple_(ActorMovieAssociation.actor_id, ActorMovieAssociation.movie_id)
+    taken = set(tuple(row) for row in session.execute(select(ActorMovieAssociation.actor_id, ActorMovieAssociation.movie_id).where(keys.in_(pairs)))) if pairs else set()
+    accepted = []
+    for index, v in rows:
+        pair = (v['actor_id'], v['movie_id'])
+        if v['actor_id'] not in known_actors:
+            results[index] = {"index": index, "error": 'actor not found.'}
+        elif v['movie_id'] not in known_movies:
+            results[index] = {"index": index, "error": 'movie not found.'}
+        elif pair in taken:
+            results[index] = {"index": index, "error": 'association already exists.'}
+        else:
+            taken.add(pair)
+            accepted.append((index, v))
+    for batch in _batches(accepted):
+        session.execute(insert(ActorMovieAssociation).values([v for _, v in batch]))
+    refresh_projections(session, actor_ids=[v['actor_id'] for _, v in accepted], movie_ids=[v['movie_id'] for _, v in accepted])
+    for index, v in accepted:
+        results[index] = {"index": index, "actor_id": v['actor_id'], "movie_id": v['movie_id']}
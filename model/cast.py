@@ -0,0 +1,69 @@
+from sqlalchemy import delete, insert, select, update, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from model.actor import Actor
+from model.actor_movie import ActorMovieAssociation
+from model.projections import refresh_projections
+
+#
+# Set-based upsert of associations
+#
+def upsert_associations(session, rows):
+    """ Inserts associations, updating the character name of the existing ones.
+
+    Uses a single INSERT ... ON CONFLICT DO UPDATE statement on PostgreSQL and
+    SQLite, and an UPDATE plus an INSERT statement on other databases.
+
+    Arguments:
+        rows: list of dicts with actor_id, movie_id and character_name.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert_(ActorMovieAssociation).values(rows)
+        statement = statement.on_conflict_do_update(index_elements=['actor_id', 'movie_id'], set_={'character_name': statement.excluded.character_name})
+        session.execute(statement)
+        return
+    keys = tuple_(ActorMovieAssociation.actor_id, ActorMovieAssociation.movie_id)
+    existing = set(tuple(row) for row in session.execute(select(ActorMovieAssociation.actor_id, ActorMovieAssociation.movie_id).where(keys.in_([(r['actor_id'], r['movie_id']) for r in rows]))))
+    updated = [r for r in rows if (r['actor_id'], r['movie_id']) in existing]
+    created = [r for r in rows if (r['actor_id'], r['movie_id']) not in existing]
+    if updated:
+        session.execute(update(ActorMovieAssociation), updated)
+    if created:
+        session.execute(insert(ActorMovieAssociation).values(created))
+
+#
+# Cast replacement
+#
+def replace_cast(session, movie_id, cast):
+    """ Replaces the cast of a movie, applying only the differences with the current one
+    (and refreshing the cast and filmographies they change).
+
+    Arguments:
+        movie_id: the movie's id.
+        cast: the desired cast, as a dict of character names keyed by actor id.
+
+    Returns the number of removed, updated and added associations.
+    Raises ValueError if some actor does not exist.
+    """
+    if cast:
+        known_actors = set(session.scalars(select(Actor.id).where(Actor.id.in_(cast.keys()))))
+        unknown_actors = sorted(set(cast.keys()) - known_actors)
+        if unknown_actors:
+            raise ValueError(f'unknown actors: {unknown_actors}')
+    current = dict(session.execute(select(ActorMovieAssociation.actor_id, ActorMovieAssociation.character_name).where(ActorMovieAssociation.movie_id == movie_id)).all())
+    removed = [actor_id for actor_id in current if actor_id not in cast]
+    changed = [{'actor_id': actor_id, 'movie_id': movie_id, 'character_name': character_name} for actor_id, character_name in cast.items() if current.get(actor_id) != character_name]
+    if removed:
+        session.execute(delete(ActorMovieAssociation).where(ActorMovieAssociation.movie_id == movie_id, ActorMovieAssociation.actor_id.in_(removed)))
+    upsert_associations(session, changed)
+    if removed or changed:
+        refresh_projections(session, actor_ids=removed + [c['actor_id'] for c in changed], movie_ids=[movie_id])
+    return {
+        "removed": len(removed),
+        "updated": sum(1 for c in changed if c['actor_id'] in current),
+        "added": sum(1 for c in changed if c['actor_id'] not in current)
+    }
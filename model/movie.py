@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Date, Index, JSON
+from sqlalchemy.orm import relationship, deferred
 from model.base import Base
+from model.search import search_indexes
 from model.actor_movie import actor_movie_association
 
 #
@@ -8,11 +9,22 @@ from model.actor_movie import actor_movie_association
 #
 class Movie(Base):
     __tablename__ = 'movie'
+    # indexes backing the list filters and sort orders (id last, as the keyset tie-breaker):
+    # the genre filter (or none), sorted by any field (release_date ranges require sorting by release_date, see SortOrder)
+    __table_args__ = (
+        Index('ix_movie_genre', 'genre', 'id'),
+        Index('ix_movie_release_date', 'release_date', 'id'),
+        Index('ix_movie_genre_release_date', 'genre', 'release_date', 'id'),
+        # search by title (see model/search.py)
+        *search_indexes('movie', 'title'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, unique=True)
     genre = Column(String, unique=False)
     release_date = Column(Date, unique=False)
+    # denormalized associations ([actor id, name, character name] triples, see model/projections.py), only loaded when requested
+    cast = deferred(Column(JSON, nullable=False, default=list, server_default='[]'))
     associations = relationship('ActorMovieAssociation',back_populates='movies')
     actors = relationship('Actor', secondary=actor_movie_association, back_populates='movies', overlaps="actors, movies, associations")
         
@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+import os
+from datetime import date
+from sqlalchemy import Date, Integer, and_, or_, tuple_
+
+# page size used when the client does not ask for one, and the largest page the server returns
+DEFAULT_PAGE_SIZE = int(os.environ.get('PAGE_SIZE_DEFAULT', 50))
+MAX_PAGE_SIZE = int(os.environ.get('PAGE_SIZE_MAX', 500))
+
+#
+# Invalid cursor exception
+#
+class InvalidCursor(ValueError):
+    pass
+
+#
+# Opaque cursors
+#
+def encode_cursor(values):
+    """ Encodes the keyset values of the last row of a page into an opaque cursor.
+    """
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def decode_cursor(cursor):
+    """ Decodes a cursor produced by encode_cursor.
+
+    Raises InvalidCursor if the cursor was not produced by encode_cursor.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor(f'invalid cursor: {cursor}') from e
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor(f'invalid cursor: {cursor}')
+    return values
+
+#
+# Keyset pagination
+#
+def page_size(limit=None):
+    """ Returns the effective page size, capped at MAX_PAGE_SIZE.
+    """
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _cursor_value(column, value):
+    """ Converts a value of a cursor back to the type of its column (dates are encoded in ISO format).
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(column.type, Date):
+            return date.fromisoformat(value)
+        if isinstance(column.type, Integer) and not isinstance(value, bool):
+            return int(value) if isinstance(value, int) else None
+        return str(value) if isinstance(value, str) else None
+    except (TypeError, ValueError):
+        return None
+
+def seek(query, key, cursor=None, sort=None, descending=False):
+    """ Returns the query ordered by an optional sort column and then by a unique, not null column, 
+    starting after the row the cursor points to.
+
+    Rows with a null sort value come last in ascending order (and first in descending order),
+    so that descending pages are the exact reverse of ascending ones and both can be served
+    by the same (sort, key) index.
+
+    Arguments:
+        query: the query to order.
+        key: the unique, not null column (e.g. Actor.id).
+        cursor: cursor returned along with the previous page.
+        sort: the column to sort by first (e.g. Actor.birth_date), or None to sort by key only.
+        descending: whether the order is descending.
+    """
+    columns = [key] if sort is None else [sort, key]
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise InvalidCursor(f'invalid cursor: {cursor}')
+        last_key = _cursor_value(key, values[-1])
+        if last_key is None:
+            raise InvalidCursor(f'invalid cursor: {cursor}')
+        after = key < last_key if descending else key > last_key
+        if sort is not None:
+            last_sort = _cursor_value(sort, values[0])
+            if last_sort is None and values[0] is not None:
+                raise InvalidCursor(f'invalid cursor: {cursor}')
+            if last_sort is None:
+                # within the null values
+                after = and_(sort.is_(None), after) if not descending else or_(sort.is_not(None), and_(sort.is_(None), after))
+            elif descending:
+                after = tuple_(sort, key) < (last_sort, last_key)
+            else:
+                after = or_(tuple_(sort, key) > (last_sort, last_key), sort.is_(None))
+        query = query.filter(after)
+    if sort is None:
+        return query.order_by(key.desc() if descending else key)
+    if descending:
+        return query.order_by(sort.desc().nulls_first(), key.desc())
+    return query.order_by(sort.asc().nulls_last(), key)
+
+def paginate(query, key, limit=None, cursor=None, sort=None, descending=False):
+    """ Returns a page of a query, keyed on a unique, not null column.
+
+    Arguments:
+        query: the query to paginate.
+        key: the column ending the sort order (e.g. Actor.id).
+        limit: requested page size.
+        cursor: cursor returned along with the previous page.
+        sort: the column to sort by first, or None to sort by key only.
+        descending: whether the order is descending.
+
+    Returns the rows of the page and the cursor of the next page (None on the last page).
+    """
+    size = page_size(limit)
+    query = seek(query, key, cursor, sort, descending)
+    # fetches one extra row to find out whether there is a next page
+    rows = query.limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    values = [getattr(rows[-1], column.key) for column in ([key] if sort is None else [sort, key])]
+    return rows, encode_cursor([v.isoformat() if isinstance(v, date) else v for v in values])
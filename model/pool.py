@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from utils.metrics import db_pool_checkouts, db_pool_checked_out, db_pool_wait, db_pool_timeouts
+
+#
+# Connection pool statistics
+#
+class PoolStatistics:
+    """ Counters of the connection pool checkouts and of the time spent waiting for a connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.waits = 0
+            self.wait_time = 0.0
+            self.max_wait_time = 0.0
+            self.timeouts = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += seconds
+            self.max_wait_time = max(self.max_wait_time, seconds)
+            if timed_out:
+                self.timeouts += 1
+        db_pool_wait.observe(seconds)
+        if timed_out:
+            db_pool_timeouts.inc()
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if counter == 'checkouts':
+            db_pool_checkouts.inc()
+            db_pool_checked_out.inc()
+        elif counter == 'checkins':
+            db_pool_checked_out.dec()
+
+    def snapshot(self):
+        """ Returns the counters as a dictionary.
+        """
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checkouts - self.checkins,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "max_wait_time": self.max_wait_time,
+                "timeouts": self.timeouts
+            }
+
+pool_statistics = PoolStatistics()
+
+#
+# Queue pool that times connection checkouts
+#
+class InstrumentedQueuePool(QueuePool):
+    """ QueuePool recording how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_statistics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_statistics.record_wait(time.perf_counter() - start)
+        return connection
+
+def instrument_pool(engine):
+    """ Registers the listeners counting connections, checkouts and checkins of an engine's pool.
+    """
+    event.listen(engine, 'connect', lambda dbapi_connection, connection_record: pool_statistics.record('connects'))
+    event.listen(engine, 'checkout', lambda dbapi_connection, connection_record, connection_proxy: pool_statistics.record('checkouts'))
+    event.listen(engine, 'checkin', lambda dbapi_connection, connection_record: pool_statistics.record('checkins'))
+
+#
+# Pool configuration
+#
+def pool_options(database_path):
+    """ Returns the create_engine pool arguments set by the environment.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and DB_POOL_RECYCLE map to the
+    homonymous create_engine arguments, and DB_POOL_PRE_PING=1 enables pool_pre_ping.
+    Sizing arguments are not applied to SQLite databases, which do not use a queue pool.
+    """
+    options = {}
+    if os.environ.get('DB_POOL_PRE_PING') is not None:
+        options['pool_pre_ping'] = os.environ['DB_POOL_PRE_PING'] != '0'
+    if os.environ.get('DB_POOL_RECYCLE') is not None:
+        options['pool_recycle'] = int(os.environ['DB_POOL_RECYCLE'])
+    if database_path.startswith('sqlite'):
+        return options
+    options['poolclass'] = InstrumentedQueuePool
+    for var, option, cast in (('DB_POOL_SIZE', 'pool_size', int), ('DB_MAX_OVERFLOW', 'max_overflow', int), ('DB_POOL_TIMEOUT', 'pool_timeout', float)):
+        if os.environ.get(var) is not None:
+            options[option] = cast(os.environ[var])
+    return options
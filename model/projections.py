@@ -0,0 +1,86 @@
+import os
+from sqlalchemy import bindparam, select, update
+
+from model.actor import Actor
+from model.movie import Movie
+from model.actor_movie import ActorMovieAssociation
+
+# reads return the denormalized filmographies and casts instead of joining the associations, with DENORMALIZED_READS=1
+# (they are maintained by the writes either way, so that the reads can be switched over once the columns are rebuilt)
+DENORMALIZED_READS = os.environ.get('DENORMALIZED_READS') == '1'
+
+# actors or movies refreshed per statement
+REFRESH_BATCH_SIZE = 500
+
+def _batches(ids):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+        yield ids[start:start + REFRESH_BATCH_SIZE]
+
+#
+# Related actors and movies
+#
+def movies_of(session, actor_ids):
+    """ Returns the ids of the movies the given actors play in.
+    """
+    if not actor_ids:
+        return []
+    return list(session.scalars(select(ActorMovieAssociation.movie_id).where(ActorMovieAssociation.actor_id.in_(actor_ids)).distinct()))
+
+def actors_of(session, movie_ids):
+    """ Returns the ids of the actors playing in the given movies.
+    """
+    if not movie_ids:
+        return []
+    return list(session.scalars(select(ActorMovieAssociation.actor_id).where(ActorMovieAssociation.movie_id.in_(movie_ids)).distinct()))
+
+#
+# Filmography and cast projections
+#
+def _refresh(session, model, column, key, other_key, other_column, ids):
+    """ Recomputes a projection column ([other id, other name/title, character name] triples, by other id)
+    of the given rows, with one query and one UPDATE statement per batch of rows.
+    """
+    other_model = other_column.class_
+    table = model.__table__
+    statement = update(table).where(table.c.id == bindparam('_id')).values({column: bindparam('_projection')})
+    for batch in _batches(ids):
+        # the rows are locked first (in id order): a concurrent refresh of the same rows waits for this transaction
+        # to end, and then reads the associations it committed, instead of overwriting its projections with a stale
+        # copy (FOR NO KEY UPDATE does not wait for the transactions which only insert associations referring to the rows)
+        session.execute(select(table.c.id).where(table.c.id.in_(batch)).order_by(table.c.id).with_for_update(key_share=True))
+        projections = {id: [] for id in batch}
+        rows = session.execute(select(getattr(ActorMovieAssociation, key), getattr(ActorMovieAssociation, other_key), other_column, ActorMovieAssociation.character_name)
+                               .join(other_model, other_model.id == getattr(ActorMovieAssociation, other_key))
+                               .where(getattr(ActorMovieAssociation, key).in_(batch))
+                               .order_by(getattr(ActorMovieAssociation, key), getattr(ActorMovieAssociation, other_key)))
+        for id, other_id, other_name, character_name in rows:
+            projections[id].append([other_id, other_name, character_name])
+        session.execute(statement, [{"_id": id, "_projection": projection} for id, projection in projections.items()])
+
+def refresh_projections(session, actor_ids=(), movie_ids=()):
+    """ Recomputes the filmographies of the given actors and the casts of the given movies, within the session's transaction.
+
+    Called by the writes modifying the associations, or the names/titles they refer to.
+
+    Arguments:
+        actor_ids: ids of the actors whose filmography changed.
+        movie_ids: ids of the movies whose cast changed.
+    """
+    _refresh(session, Actor, 'filmography', 'actor_id', 'movie_id', Movie.title, actor_ids)
+    _refresh(session, Movie, 'cast', 'movie_id', 'actor_id', Actor.name, movie_ids)
+
+def rebuild_projections(session):
+    """ Recomputes the filmographies and casts of all the actors and movies, committing one batch at a time.
+
+    Returns the number of actors and movies refreshed.
+    """
+    actor_ids = list(session.scalars(select(Actor.id)))
+    movie_ids = list(session.scalars(select(Movie.id)))
+    for batch in _batches(actor_ids):
+        refresh_projections(session, actor_ids=batch)
+        session.commit()
+    for batch in _batches(movie_ids):
+        refresh_projections(session, movie_ids=batch)
+        session.commit()
+    return len(actor_ids), len(movie_ids)
@@ -0,0 +1,91 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+
+#
+# Statement shapes
+#
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|\?')
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+def statement_shape(statement):
+    """ Returns the shape of a statement: its text, with placeholders normalized and
+    expanded IN lists collapsed, so that the same query with other parameters has the same shape.
+    """
+    return _PLACEHOLDER_LIST.sub('?', _PLACEHOLDER.sub('?', ' '.join(statement.split())))
+
+#
+# Per-request query recorder
+#
+class QueryRecorder:
+    """ Number, total duration and slowest of the statements executed while recording
+    (e.g. during a request), along with the number of executions of each statement shape.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        if duration >= self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, max_repeats):
+        """ Returns the (shape, count) pairs of the shapes executed more than max_repeats times, most repeated first.
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > max_repeats]
+
+# recorder of the current request (None when not recording)
+current_recorder = ContextVar('current_recorder', default=None)
+
+def start_recording():
+    """ Starts recording the statements of the current context. Returns the recorder, and the token to stop recording.
+    """
+    recorder = QueryRecorder()
+    return recorder, current_recorder.set(recorder)
+
+def stop_recording(token):
+    try:
+        current_recorder.reset(token)
+    except ValueError:
+        # the token was created in another context (e.g. a streamed response finished elsewhere)
+        current_recorder.set(None)
+
+#
+# Engine listeners
+#
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+    if context is not None:
+        context.query_timed = True
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    recorder = current_recorder.get()
+    if recorder is not None:
+        recorder.record(statement, duration)
+
+def _handle_error(exception_context):
+    # failed statements are not timed (statements failing before their execution, e.g. on
+    # their parameters, were not started)
+    context = exception_context.execution_context
+    if exception_context.connection is not None and getattr(context, 'query_timed', False):
+        start_times = exception_context.connection.info.get('query_start_time')
+        if start_times:
+            start_times.pop()
+
+def instrument_queries(engine):
+    """ Registers the listeners timing the statements executed by an engine.
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
@@ -0,0 +1,234 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session as _Session
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+# seconds between two health checks of the replicas
+REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 10))
+# replicas lagging more than this number of seconds behind the primary are not used (PostgreSQL only)
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 30))
+
+#
+# Read replicas
+#
+class Replica:
+    """ A read replica: its (lazily created) engine and health.
+    """
+
+    def __init__(self, url, engine_factory):
+        self.url = url
+        self._engine_factory = engine_factory
+        self._engine = None
+        self.healthy = True
+        self.lag = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = self._engine_factory(self.url)
+            # connection failures take the replica out of rotation until its next successful check
+            event.listen(self._engine, 'handle_error', self._handle_error)
+        return self._engine
+
+    def _handle_error(self, exception_context):
+        if exception_context.is_disconnect or exception_context.connection is None:
+            if self.healthy:
+                logger.warning(f'Read replica {self.name} is unavailable: {exception_context.original_exception}')
+            self.healthy = False
+
+    @property
+    def name(self):
+        return make_url(self.url).render_as_string(hide_password=True)
+
+    def check(self, max_lag):
+        """ Connects to the replica, and measures its replication lag (PostgreSQL standbys only).
+        """
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == 'postgresql':
+                    # NULL on a server which is not a standby. A standby which has replayed all the WAL it received is up
+                    # to date, however long ago it replayed the last transaction (the primary may have been idle since)
+                    self.lag = connection.execute(text('SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                                                       'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END')).scalar()
+                else:
+                    connection.execute(text('SELECT 1'))
+            healthy = self.lag is None or self.lag <= max_lag
+            if not healthy:
+                logger.warning(f'Read replica {self.name} lags {self.lag:.1f}s behind the primary')
+        except Exception as e:
+            logger.warning(f'Read replica {self.name} failed its health check: {e}')
+            healthy = False
+        self.healthy = healthy
+        return healthy
+
+    def dispose(self):
+        if self._engine is not None:
+            self._engine.dispose()
+
+class ReplicaSet:
+    """ Read replicas, used in turn as long as they pass their health checks.
+
+    Checks run in a background thread, at most every 'check_interval' seconds, so
+    choosing a replica never waits for them. When no replica is healthy, reads go
+    to the primary.
+
+    After a write, the reads of the same client go to the primary for 'max_lag'
+    seconds, so that it reads its own writes. The other clients keep reading from
+    the replicas, which may not have replayed the write yet: until 'max_lag' seconds
+    have passed, their responses are neither tagged with the new collection versions
+    nor cached (see may_be_stale; writes are only known within this process).
+    """
+
+    def __init__(self, urls, engine_factory, check_interval=REPLICA_CHECK_INTERVAL, max_lag=REPLICA_MAX_LAG):
+        """
+        Initializes the replica set.
+
+        Arguments:
+            urls: database URLs of the replicas.
+            engine_factory: function creating the engine of a URL.
+            check_interval: seconds between two health checks.
+            max_lag: maximum replication lag of a healthy replica, in seconds.
+        """
+        self.replicas = [Replica(url, engine_factory) for url in urls]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._checking = False
+        self._last_check = time.monotonic()
+        self._last_write = None
+        # clients whose reads go to the primary, by expiry (the expired ones are at the front)
+        self._pinned = OrderedDict()
+
+    def record_write(self, client=None):
+        """ Records a write, sending the reads of its client (if known) to the primary for 'max_lag' seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_write = now
+            if client is not None:
+                self._pinned[client] = now + self.max_lag
+                self._pinned.move_to_end(client)
+            while self._pinned and next(iter(self._pinned.values())) <= now:
+                self._pinned.popitem(last=False)
+
+    def pinned(self, client):
+        """ Returns whether the reads of a client go to the primary (after its own writes).
+        """
+        with self._lock:
+            return client is not None and self._pinned.get(client, 0.0) > time.monotonic()
+
+    def may_be_stale(self, client=None):
+        """ Returns whether the reads of a client may come from a replica which has not replayed a recent write yet.
+        """
+        with self._lock:
+            recent_write = self._last_write is not None and time.monotonic() - self._last_write < self.max_lag
+        return recent_write and not self.pinned(client)
+
+    def check(self):
+        """ Checks every replica, returning the number of healthy ones.
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+        return sum(replica.check(self.max_lag) for replica in self.replicas)
+
+    def _check_in_background(self):
+        """ Checks the replicas in a daemon thread, unless one is already running.
+        """
+        with self._lock:
+            if self._checking:
+                return
+            self._checking = True
+
+        def run():
+            try:
+                self.check()
+            finally:
+                with self._lock:
+                    self._checking = False
+
+        threading.Thread(target=run, name='replica-check', daemon=True).start()
+
+    def choose(self, client=None):
+        """ Returns the engine of the next healthy replica, or None if the reads of the client must go to the primary.
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._check_in_background()
+        if self.pinned(client):
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)].engine
+
+    def status(self):
+        return [{"url": replica.name, "healthy": replica.healthy, "lag": replica.lag} for replica in self.replicas]
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.dispose()
+
+#
+# Read-only handlers
+#
+# set while a read-only handler runs
+replica_reads = ContextVar('replica_reads', default=False)
+# the client of the current request (e.g. a digest of its access token), whose reads follow its own writes
+replica_client = ContextVar('replica_client', default=None)
+
+def read_only(f):
+    """ Lets the database reads of a handler go to a read replica (when there is one).
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        token = replica_reads.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+    return wrapper
+
+#
+# Session routing
+#
+class RoutingSession(_Session):
+    """ Session sending the reads of read-only handlers to a replica, and everything else to the primary.
+
+    The choice is kept for the lifetime of the session (i.e. the request, including
+    streamed responses), and once the session writes, its reads go to the primary as
+    well, so that it reads its own writes (as do the next requests of its client, for
+    a while, see ReplicaSet).
+    """
+
+    def __init__(self, *args, replicas=None, **kwargs):
+        """
+        Initializes the session.
+
+        Arguments:
+            replicas: read replicas of the database (None without replicas).
+        """
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['primary'] = True
+            if self.replicas is not None:
+                self.replicas.record_write(replica_client.get())
+        if self.replicas is not None and not self.info.get('primary'):
+            if 'replica' not in self.info and replica_reads.get():
+                self.info['replica'] = self.replicas.choose(replica_client.get())
+            if self.info.get('replica') is not None:
+                return self.info['replica']
+        return super().get_bind(mapper, clause=clause, **kwargs)
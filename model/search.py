@@ -0,0 +1,104 @@
+from sqlalchemy import DDL, Index, and_, case, event, func, literal, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import to_tsvector
+
+from model.base import Base
+
+# text search configuration: no stemming nor stop words (names and titles are not prose)
+TEXT_SEARCH_CONFIG = literal_column("'simple'")
+
+# number of typeahead suggestions returned when the client does not ask for a number
+TYPEAHEAD_SIZE = 10
+
+# trigram matching requires the pg_trgm extension
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+#
+# Search indexes
+#
+def search_indexes(table, column):
+    """ Returns the indexes backing the search of a text column, to be added to the table arguments of a model.
+
+    On PostgreSQL: a GIN index on the column's tsvector (full words), a GIN trigram
+    index (partial or misspelled words) and a "C" collated btree index on the
+    lowercased column (prefixes). On SQLite: a btree index on the lowercased column.
+
+    Arguments:
+        table: the table name (e.g. 'actor').
+        column: the column name (e.g. 'name').
+    """
+    return (
+        Index(f'ix_{table}_{column}_fts', to_tsvector(TEXT_SEARCH_CONFIG, text(column)), postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index(f'ix_{table}_{column}_trgm', column, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index(f'ix_{table}_{column}_prefix', func.lower(text(column)).collate('C')).ddl_if(dialect='postgresql'),
+        Index(f'ix_{table}_{column}_lower', func.lower(text(column))).ddl_if(dialect='sqlite'),
+    )
+
+#
+# Ranked search
+#
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search(session, model, column, q, limit):
+    """ Returns the (id, text, rank) of the rows best matching a search query, best first.
+
+    On PostgreSQL, rows match when they contain all the words of the query, contain
+    the query itself, or hold words similar enough to it (trigram word similarity).
+    Full matches rank above partial ones, each group being ranked by similarity.
+
+    Elsewhere (e.g. SQLite), rows match when they contain all the words of the query,
+    and are ranked by where the query appears: whole text, prefix, word prefix, anywhere.
+
+    Arguments:
+        model: the mapped class (Actor or Movie).
+        column: the searched column (e.g. Actor.name).
+        q: the search query.
+        limit: the maximum number of results.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        document = to_tsvector(TEXT_SEARCH_CONFIG, column)
+        query = func.plainto_tsquery(TEXT_SEARCH_CONFIG, q)
+        full_match = document.op('@@')(query)
+        # partial or misspelled words: the query is compared to the closest part of the text (e.g. 'Schwarz' or
+        # 'Kubrik' to 'Schwarzenegger' or 'Kubrick'), rather than to the whole of it, or contained in it. Both
+        # conditions are answered by the trigram index
+        partial_match = or_(literal(q).op('<%')(column), column.ilike(f'%{_escape_like(q)}%', escape='\\'))
+        rank = case((full_match, 1.0), else_=0.0) + func.word_similarity(q, column)
+        condition = or_(full_match, partial_match)
+    else:
+        lowered = func.lower(column)
+        q = ' '.join(q.lower().split())
+        pattern = _escape_like(q)
+        rank = case(
+            (lowered == q, 1.0),
+            (lowered.like(f'{pattern}%', escape='\\'), 0.75),
+            (lowered.like(f'% {pattern}%', escape='\\'), 0.5),
+            else_=0.25
+        )
+        condition = and_(*[lowered.like(f'%{_escape_like(word)}%', escape='\\') for word in q.split()])
+    statement = select(model.id, column, rank.label('rank')).where(condition).order_by(rank.desc(), model.id).limit(limit)
+    return session.execute(statement).all()
+
+#
+# Typeahead
+#
+def typeahead(session, model, column, prefix, limit):
+    """ Returns the (id, text) of the rows starting with a prefix (case-insensitive), in alphabetical order.
+
+    The prefix is turned into a range of the lowercased column, which is answered
+    by a scan of the prefix index limited to the returned rows.
+
+    Arguments:
+        model: the mapped class (Actor or Movie).
+        column: the searched column (e.g. Actor.name).
+        prefix: the prefix typed so far.
+        limit: the maximum number of results.
+    """
+    lowered = func.lower(column)
+    if session.get_bind().dialect.name == 'postgresql':
+        lowered = lowered.collate('C')
+    prefix = prefix.lower()
+    # smallest string greater than all the strings starting with the prefix
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    statement = select(model.id, column).where(lowered >= prefix, lowered < upper).order_by(lowered, model.id).limit(limit)
+    return session.execute(statement).all()
@@ -1,4 +1,8 @@
 from schemas.actor import *
 from schemas.movie import *
 from schemas.actor_movie import *
+from schemas.bulk import *
 from schemas.error import *
+from schemas.fields import *
+from schemas.pagination import *
+from schemas.batch import *
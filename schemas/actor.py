@@ -1,6 +1,13 @@
-from pydantic import BaseModel
-from typing import List
+from datetime import date
+from pydantic import BaseModel, Field, constr
+from typing import Any, List, Optional
+from sqlalchemy.orm import selectinload, load_only, undefer
+from model import projections
 from model.actor import Actor
+from model.actor_movie import ActorMovieAssociation
+from model.movie import Movie
+from schemas.pagination import PaginationQuerySchema, IdList
+from schemas.fields import FieldsQuerySchema
 from flask import jsonify
 
 class ActorPathSchema(BaseModel):
@@ -28,7 +35,17 @@ class ActorViewSchema(BaseModel):
 class ActorListSchema(BaseModel):
     """ Actor list schema.
     """
-    Actor:List[ActorViewSchema]
+    actors: List[ActorViewSchema]
+    next_cursor: Optional[str]
+
+class ActorQuerySchema(PaginationQuerySchema, FieldsQuerySchema):
+    """ Actor list query schema.
+    """
+    stream: Optional[bool] = Field(None, description="Streams the whole list as newline-delimited JSON (same as 'Accept: application/x-ndjson').")
+    gender: Optional[str] = Field(None, description="Only the actors of this gender.")
+    nationality: Optional[str] = Field(None, description="Only the actors of this nationality.")
+    birth_date_from: Optional[date] = Field(None, description="Only the actors born on or after this date (requires sorting by birth_date).")
+    birth_date_to: Optional[date] = Field(None, description="Only the actors born on or before this date (requires sorting by birth_date).")
 
 class ActorAddSchema(BaseModel):
     """ Actor add schema.
@@ -38,10 +55,29 @@ class ActorAddSchema(BaseModel):
     birth_date: str
     nationality: str
 
+class ActorBulkAddSchema(BaseModel):
+    """ Actor bulk add schema.
+    """
+    actors: List[Any] = Field(..., description="Actors to create, each one complying with ActorAddSchema (dates in ISO format).")
+
 class ActorSearchSchema(BaseModel):
     """ Actor search schema.
     """
+    q: constr(strip_whitespace=True, min_length=1) = Field(..., description="Words of the names to search for (or the first letters of the name, in typeahead mode).")
+    limit: Optional[int] = Field(None, ge=1, description="Maximum number of results (capped by the server).")
+    typeahead: Optional[bool] = Field(None, description="Returns the actors whose name starts with 'q', in alphabetical order, instead of ranked matches.")
+
+class ActorSearchResultSchema(BaseModel):
+    """ Actor search result schema.
+    """
     id: int
+    name: str
+    rank: Optional[float]
+
+class ActorSearchListSchema(BaseModel):
+    """ Actor search results schema.
+    """
+    actors: List[ActorSearchResultSchema]
 
 class ActorPatchSchema(BaseModel):
     """ Actor patch schema.
@@ -51,6 +87,9 @@ class ActorPatchSchema(BaseModel):
     birth_date: str 
     nationality: str  
 
+# fields of the representation of an actor, in order
+ACTOR_FIELDS = ['id', 'name', 'gender', 'birth_date', 'nationality']
+
 def ActorPatchRepresentation(actor: Actor):
     """ Returns the patch representation of an actor.
     """    
@@ -61,26 +100,79 @@ def ActorPatchRepresentation(actor: Actor):
         "nationality": actor.nationality  
     }
         
-def ActorRepresentation(actor: Actor):
+def ActorQueryOptions(fields: Optional[List[str]] = None, associations: bool = True):
+    """ Returns the loader options used by ActorRepresentation.
+
+    Only the requested columns are loaded. The associations (if requested) are read
+    from the denormalized filmography column with DENORMALIZED_READS=1, or else the associations
+    of all the queried actors, along with the movie titles, are loaded by a single additional query.
+
+    Arguments:
+        fields: the fields to return (all by default).
+        associations: whether the associations are returned.
+    """
+    options = []
+    denormalized = associations and projections.DENORMALIZED_READS
+    if fields is not None:
+        options.append(load_only(*[getattr(Actor, f) for f in fields], *([Actor.filmography] if denormalized else [])))
+    elif denormalized:
+        options.append(undefer(Actor.filmography))
+    if associations and not denormalized:
+        options.append(selectinload(Actor.associations).joinedload(ActorMovieAssociation.movies).load_only(Movie.id, Movie.title))
+    return options
+
+# columns the actors can be sorted by (besides id)
+ACTOR_SORTS = {'gender': Actor.gender, 'nationality': Actor.nationality, 'birth_date': Actor.birth_date}
+
+def ActorFilters(query: ActorQuerySchema):
+    """ Returns the filter criteria of an actor list query.
+    """
+    criteria = []
+    ids = IdList(query)
+    if ids is not None:
+        criteria.append(Actor.id.in_(ids))
+    if query.gender is not None:
+        criteria.append(Actor.gender == query.gender)
+    if query.nationality is not None:
+        criteria.append(Actor.nationality == query.nationality)
+    if query.birth_date_from is not None:
+        criteria.append(Actor.birth_date >= query.birth_date_from)
+    if query.birth_date_to is not None:
+        criteria.append(Actor.birth_date <= query.birth_date_to)
+    return criteria
+
+def ActorRepresentation(actor: Actor, fields: Optional[List[str]] = None, associations: bool = True):
     """ Returns the representation of an actor.
-    """    
-    associations = []
-    for m in actor.movies:
-        for a in m.associations:
-            if a.actor_id == actor.id:
-                associations.append([m.id, m.title, a.character_name])                
+
+    Arguments:
+        fields: the fields to return (all by default).
+        associations: whether the associations are returned.
+    """
+    if fields is None:
+        representation = {
+            "id": actor.id,
+            "name": actor.name,
+            "gender": actor.gender,
+            "birth_date": actor.birth_date,
+            "nationality": actor.nationality
+        }
+    else:
+        representation = {f: getattr(actor, f) for f in fields}
+    if associations:
+        representation["assocations"] = actor.filmography if projections.DENORMALIZED_READS else [[a.movie_id, a.movies.title, a.character_name] for a in actor.associations]
+    return representation
+
+def ActorListRepresentation(actors: List[Actor], next_cursor: Optional[str] = None, fields: Optional[List[str]] = None, associations: bool = True):
+    """ Returns the representation of a (page of a) list of actors.
+    """
     return {
-        "id": actor.id,
-        "name": actor.name,
-        "gender": actor.gender,
-        "birth_date": actor.birth_date,
-        "nationality": actor.nationality,
-        "assocations": associations   
+        "actors": [ActorRepresentation(a, fields, associations) for a in actors],
+        "next_cursor": next_cursor
     }
 
-def ActorListRepresentation(actors: List[Actor]):
-    """ Returns the representation of a list of actors.
+def ActorSearchRepresentation(results):
+    """ Returns the representation of search results, as (id, name[, rank]) rows.
     """
     return {
-        "actors": [ActorRepresentation(a) for a in actors]
-    }
\ No newline at end of file
+        "actors": [{"id": r[0], "name": r[1], "rank": float(r[2]) if len(r) > 2 else None} for r in results]
+    }
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Any, List
 from model.actor_movie import ActorMovieAssociation
 
 class ActorMovieSchema(BaseModel):
@@ -14,6 +15,11 @@ class ActorMovieDeleteSchema(BaseModel):
     actor_id: int 
     movie_id: int 
 
+class ActorMovieBulkAddSchema(BaseModel):
+    """ ActorMovie bulk add schema.
+    """
+    associations: List[Any] = Field(..., description="Associations to create, each one complying with ActorMovieSchema.")
+
 def ActorMovieRepresentation(actor_movie: ActorMovieAssociation):
     """ Returns the representation of an actor-movie association.
     """    
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class BatchOperationSchema(BaseModel):
+    """ Batch operation schema.
+    """
+    method: str = Field(..., regex='^(POST|PUT|PATCH|DELETE)$', description="HTTP method of the operation (write operations only).")
+    path: str = Field(..., description="Path of the operation (e.g. /api/v1/actors/1), including its query string if any.")
+    body: Optional[Any] = Field(None, description="JSON body of the operation (e.g. for the bulk and cast endpoints).")
+    form: Optional[Dict[str, Any]] = Field(None, description="Form fields of the operation (e.g. for the single-item creations and updates).")
+
+class BatchSchema(BaseModel):
+    """ Batch schema.
+    """
+    operations: List[BatchOperationSchema] = Field(..., description="Operations to run, in order.")
+    atomic: bool = Field(True, description="Commits all the operations or none of them: the first failure rolls back the batch, and the next operations are not run. "
+                                          "Otherwise, each operation runs in its own savepoint, and only the failed ones are rolled back.")
+
+class BatchOperationResultSchema(BaseModel):
+    """ Batch operation result schema.
+    """
+    index: int
+    status: int
+    body: Optional[Any]
+
+class BatchResultSchema(BaseModel):
+    """ Batch result schema.
+    """
+    committed: bool
+    results: List[BatchOperationResultSchema]
+
+def BatchResultRepresentation(results: List[dict], committed: bool):
+    """ Returns the representation of the per-operation results of a batch.
+    """
+    return {
+        "committed": committed,
+        "results": results
+    }
@@ -0,0 +1,53 @@
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Optional
+from datetime import date
+
+class BulkItemResultSchema(BaseModel):
+    """ Bulk item result schema.
+    """
+    index: int
+    id: Optional[int]
+    actor_id: Optional[int]
+    movie_id: Optional[int]
+    error: Optional[str]
+
+class BulkResultSchema(BaseModel):
+    """ Bulk result schema.
+    """
+    created: int
+    failed: int
+    results: List[BulkItemResultSchema]
+
+def BulkValidate(items: List[Any], schema, dates=()):
+    """ Validates the items of a bulk request, one at a time.
+
+    Arguments:
+        items: the request items.
+        schema: the schema each item must comply with.
+        dates: names of the fields holding ISO dates.
+
+    Returns the valid (index, values) pairs, and the per-item results holding the validation errors.
+    """
+    rows = []
+    results = [None] * len(items)
+    for index, item in enumerate(items):
+        try:
+            values = schema.parse_obj(item).dict()
+            for field in dates:
+                values[field] = date.fromisoformat(values[field])
+            rows.append((index, values))
+        except ValidationError as e:
+            results[index] = {"index": index, "error": '; '.join(f'{".".join(str(l) for l in error["loc"])}: {error["msg"]}' for error in e.errors())}
+        except ValueError as e:
+            results[index] = {"index": index, "error": str(e)}
+    return rows, results
+
+def BulkResultRepresentation(results: List[dict]):
+    """ Returns the representation of the per-item results of a bulk request.
+    """
+    failed = sum(1 for r in results if 'error' in r)
+    return {
+        "created": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }
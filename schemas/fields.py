@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class FieldsQuerySchema(BaseModel):
+    """ Sparse fieldset query schema.
+    """
+    fields: Optional[str] = Field(None, description="Comma-separated list of the fields to return (by default, all of them along with the associations).")
+    include: Optional[str] = Field(None, description="'associations' to also return the associations when 'fields' is set.")
+
+#
+# Invalid fieldset exception
+#
+class InvalidFieldset(ValueError):
+    pass
+
+def Fieldset(query: FieldsQuerySchema, allowed):
+    """ Returns the fields requested by a query, and whether the associations are requested too.
+
+    Without 'fields', None is returned (all the fields) along with the associations.
+
+    Arguments:
+        query: the request query.
+        allowed: names of the fields that can be requested, in representation order.
+
+    Raises InvalidFieldset if an unknown field or inclusion is requested, or if 'fields' is empty.
+    """
+    include = {i.strip() for i in query.include.split(',') if i.strip()} if query.include else set()
+    if include - {'associations'}:
+        raise InvalidFieldset(f'unknown inclusions: {sorted(include - {"associations"})}')
+    if query.fields is None:
+        return None, True
+    fields = {f.strip() for f in query.fields.split(',') if f.strip()}
+    if not fields:
+        raise InvalidFieldset('no fields requested')
+    if fields - set(allowed):
+        raise InvalidFieldset(f'unknown fields: {sorted(fields - set(allowed))}')
+    return [f for f in allowed if f in fields], 'associations' in include
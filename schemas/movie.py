@@ -1,6 +1,13 @@
-from pydantic import BaseModel
-from typing import List
+from datetime import date
+from pydantic import BaseModel, Field, constr
+from typing import Any, List, Optional
+from sqlalchemy.orm import selectinload, load_only, undefer
+from model import projections
+from model.actor import Actor
+from model.actor_movie import ActorMovieAssociation
 from model.movie import Movie
+from schemas.pagination import PaginationQuerySchema, IdList
+from schemas.fields import FieldsQuerySchema
 
 class MoviePathSchema(BaseModel):
     """ Movie path schema.
@@ -26,7 +33,16 @@ class MovieViewSchema(BaseModel):
 class MovieListSchema(BaseModel):
     """ Movie list schema.
     """
-    Movie:List[MovieViewSchema]
+    movies: List[MovieViewSchema]
+    next_cursor: Optional[str]
+
+class MovieQuerySchema(PaginationQuerySchema, FieldsQuerySchema):
+    """ Movie list query schema.
+    """
+    stream: Optional[bool] = Field(None, description="Streams the whole list as newline-delimited JSON (same as 'Accept: application/x-ndjson').")
+    genre: Optional[str] = Field(None, description="Only the movies of this genre.")
+    release_date_from: Optional[date] = Field(None, description="Only the movies released on or after this date (requires sorting by release_date).")
+    release_date_to: Optional[date] = Field(None, description="Only the movies released on or before this date (requires sorting by release_date).")
 
 class MovieAddSchema(BaseModel):
     """ Movie add schema.
@@ -35,10 +51,40 @@ class MovieAddSchema(BaseModel):
     genre: str
     release_date: str
 
+class MovieBulkAddSchema(BaseModel):
+    """ Movie bulk add schema.
+    """
+    movies: List[Any] = Field(..., description="Movies to create, each one complying with MovieAddSchema (dates in ISO format).")
+
+class MovieCastMemberSchema(BaseModel):
+    """ Movie cast member schema.
+    """
+    actor_id: int
+    character_name: str
+
+class MovieCastSchema(BaseModel):
+    """ Movie cast schema.
+    """
+    cast: List[MovieCastMemberSchema] = Field(..., description="The whole cast of the movie: actors not listed are removed from it.")
+
 class MovieSearchSchema(BaseModel):
     """ Movie search schema.
     """
+    q: constr(strip_whitespace=True, min_length=1) = Field(..., description="Words of the titles to search for (or the first letters of the title, in typeahead mode).")
+    limit: Optional[int] = Field(None, ge=1, description="Maximum number of results (capped by the server).")
+    typeahead: Optional[bool] = Field(None, description="Returns the movies whose title starts with 'q', in alphabetical order, instead of ranked matches.")
+
+class MovieSearchResultSchema(BaseModel):
+    """ Movie search result schema.
+    """
     id: int
+    title: str
+    rank: Optional[float]
+
+class MovieSearchListSchema(BaseModel):
+    """ Movie search results schema.
+    """
+    movies: List[MovieSearchResultSchema]
 
 class MoviePatchSchema(BaseModel):
     """ Movie patch schema.
@@ -47,6 +93,9 @@ class MoviePatchSchema(BaseModel):
     genre: str
     release_date: str
  
+# fields of the representation of a movie, in order
+MOVIE_FIELDS = ['id', 'title', 'genre', 'release_date']
+
 def MoviePatchRepresentation(movie: Movie):
     """ Returns the patch representation of a movie.
     """
@@ -56,25 +105,76 @@ def MoviePatchRepresentation(movie: Movie):
         "release_date": movie.release_date
     }
        
-def MovieRepresentation(movie: Movie):
+def MovieQueryOptions(fields: Optional[List[str]] = None, associations: bool = True):
+    """ Returns the loader options used by MovieRepresentation.
+
+    Only the requested columns are loaded. The associations (if requested) are read
+    from the denormalized cast column with DENORMALIZED_READS=1, or else the associations
+    of all the queried movies, along with the actor names, are loaded by a single additional query.
+
+    Arguments:
+        fields: the fields to return (all by default).
+        associations: whether the associations are returned.
+    """
+    options = []
+    denormalized = associations and projections.DENORMALIZED_READS
+    if fields is not None:
+        options.append(load_only(*[getattr(Movie, f) for f in fields], *([Movie.cast] if denormalized else [])))
+    elif denormalized:
+        options.append(undefer(Movie.cast))
+    if associations and not denormalized:
+        options.append(selectinload(Movie.associations).joinedload(ActorMovieAssociation.actors).load_only(Actor.id, Actor.name))
+    return options
+
+# columns the movies can be sorted by (besides id)
+MOVIE_SORTS = {'genre': Movie.genre, 'release_date': Movie.release_date}
+
+def MovieFilters(query: MovieQuerySchema):
+    """ Returns the filter criteria of a movie list query.
+    """
+    criteria = []
+    ids = IdList(query)
+    if ids is not None:
+        criteria.append(Movie.id.in_(ids))
+    if query.genre is not None:
+        criteria.append(Movie.genre == query.genre)
+    if query.release_date_from is not None:
+        criteria.append(Movie.release_date >= query.release_date_from)
+    if query.release_date_to is not None:
+        criteria.append(Movie.release_date <= query.release_date_to)
+    return criteria
+
+def MovieRepresentation(movie: Movie, fields: Optional[List[str]] = None, associations: bool = True):
     """ Returns the representation of a movie.
+
+    Arguments:
+        fields: the fields to return (all by default).
+        associations: whether the associations are returned.
+    """
+    if fields is None:
+        representation = {
+            "id": movie.id,
+            "title": movie.title,
+            "genre": movie.genre,
+            "release_date": movie.release_date
+        }
+    else:
+        representation = {f: getattr(movie, f) for f in fields}
+    if associations:
+        representation["assocations"] = movie.cast if projections.DENORMALIZED_READS else [[a.actor_id, a.actors.name, a.character_name] for a in movie.associations]
+    return representation
+
+def MovieListRepresentation(movies: List[Movie], next_cursor: Optional[str] = None, fields: Optional[List[str]] = None, associations: bool = True):
+    """ Returns the representation of a (page of a) list of movies.
     """
-    associations = [] 
-    for a in movie.actors:
-        for m in a.associations:
-            if m.movie_id == movie.id:
-                associations.append([a.id, a.name, m.character_name])      
     return {
-        "id": movie.id,
-        "title": movie.title,
-        "genre": movie.genre,
-        "release_date": movie.release_date,
-        "assocations": associations
+        "movies": [MovieRepresentation(m, fields, associations) for m in movies],
+        "next_cursor": next_cursor
     }
 
-def MovieListRepresentation(movies: List[Movie]):
-    """ Returns the representation of a list of movies.
+def MovieSearchRepresentation(results):
+    """ Returns the representation of search results, as (id, title[, rank]) rows.
     """
     return {
-        "movies": [MovieRepresentation(m) for m in movies]
-    }
\ No newline at end of file
+        "movies": [{"id": r[0], "title": r[1], "rank": float(r[2]) if len(r) > 2 else None} for r in results]
+    }
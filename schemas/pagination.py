@@ -0,0 +1,59 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from model.pagination import MAX_PAGE_SIZE
+
+class PaginationQuerySchema(BaseModel):
+    """ Pagination query schema.
+    """
+    limit: Optional[int] = Field(None, ge=1, description="Maximum number of items in the page (capped by the server).")
+    cursor: Optional[str] = Field(None, description="Cursor returned along with the previous page.")
+    sort: Optional[str] = Field(None, description="Field to sort by (then by id), prefixed with '-' for descending order. Defaults to 'id'.")
+    ids: Optional[str] = Field(None, description="Comma-separated list of ids: only these items (at most the maximum page size, all in one page by default).")
+
+#
+# Invalid sort exception
+#
+class InvalidSort(ValueError):
+    pass
+
+def SortOrder(query: PaginationQuerySchema, columns, ranged: Optional[str] = None):
+    """ Returns the column a query sorts by (None for the id), and whether the order is descending.
+
+    Arguments:
+        query: the request query.
+        columns: the sortable columns, keyed by field name ('id' excluded).
+        ranged: the field the query filters by a range, if any.
+
+    Raises InvalidSort if the field can not be sorted by, or if the query filters by a range without being sorted
+    by the same field (the index on the range field could not serve the order).
+    """
+    sort = (query.sort or 'id').strip()
+    descending = sort.startswith('-')
+    name = sort[1:] if descending else sort
+    if name != 'id' and name not in columns:
+        raise InvalidSort(f'unknown sort field: {name}')
+    if ranged is not None and name != ranged:
+        raise InvalidSort(f'a {ranged} range requires sorting by {ranged}')
+    return (None if name == 'id' else columns[name]), descending
+
+#
+# Invalid id list exception
+#
+class InvalidIds(ValueError):
+    pass
+
+def IdList(query: PaginationQuerySchema):
+    """ Returns the ids requested by a query (None if it does not restrict the ids).
+
+    Raises InvalidIds if an id is not an integer, or if there are more ids than fit in a page.
+    """
+    if query.ids is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(i) for i in query.ids.split(',') if i.strip()))
+    except ValueError:
+        raise InvalidIds(f'invalid ids: {query.ids}')
+    if len(ids) > MAX_PAGE_SIZE:
+        raise InvalidIds(f'more than {MAX_PAGE_SIZE} ids')
+    return ids
@@ -0,0 +1,103 @@
+import datetime
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, func, insert, select, text
+
+import model
+import utils.cache
+from app import create_app
+from model import Actor, Movie, ActorMovieAssociation
+
+# database of the tests of PostgreSQL-specific behaviors (e.g. row locks, trigram indexes), which are skipped unless it is
+# set: its tables are dropped and created again by each of these tests
+POSTGRES_TEST_URL = os.environ.get('POSTGRES_TEST_URL')
+
+#
+# Test data
+#
+def actor(name, **values):
+    """ Returns the row of an actor, with default values for the columns which are not given.
+    """
+    return {"name": name, "gender": 'Female', "birth_date": datetime.date(1980, 1, 1), "nationality": 'Brazilian', **values}
+
+def movie(title, **values):
+    """ Returns the row of a movie, with default values for the columns which are not given.
+    """
+    return {"title": title, "genre": 'Drama', "release_date": datetime.date(1990, 1, 1), **values}
+
+def create_database(url, actors=(), movies=(), associations=()):
+    """ Creates the schema of a database, with the given actors, movies and associations (lists of rows).
+    """
+    engine = create_engine(url)
+    model.Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table, rows in ((Actor, actors), (Movie, movies), (ActorMovieAssociation, associations)):
+            if rows:
+                connection.execute(insert(table), list(rows))
+    engine.dispose()
+
+def count(app, table):
+    """ Returns the number of rows of a table, in the database of an application.
+    """
+    with app.extensions['database'].engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+#
+# Settings
+#
+def keep_settings(test, module, *names):
+    """ Restores the given settings (module attributes) once a test is done, so that it may change them.
+    """
+    values = {name: getattr(module, name) for name in names}
+
+    def restore():
+        for name, value in values.items():
+            setattr(module, name, value)
+
+    test.addCleanup(restore)
+
+#
+# Application test case
+#
+class AppTestCase(unittest.TestCase):
+    """ Runs each test in a temporary directory (removed afterwards, along with its SQLite
+    databases), with the response cache disabled.
+    """
+
+    # runs before each test
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.database_url = self.sqlite_url('test.db')
+        keep_settings(self, utils.cache, 'RESPONSE_CACHE_ENABLED')
+        utils.cache.RESPONSE_CACHE_ENABLED = False
+
+    def sqlite_url(self, name):
+        """ Returns the URL of a SQLite database of the test directory.
+        """
+        return f'sqlite:///{os.path.join(self.directory.name, name)}'
+
+    def create_app(self, config=None):
+        """ Creates the application on the test database, without authentication (unless configured otherwise).
+
+        The connections of its database are closed once the test is done.
+        """
+        app = create_app({"DATABASE_URL": self.database_url, "ENABLE_AUTH": False, **(config or {})})
+        self.addCleanup(app.extensions['database'].dispose)
+        return app
+
+@unittest.skipUnless(POSTGRES_TEST_URL, 'POSTGRES_TEST_URL is not set')
+class PostgresTestCase(AppTestCase):
+    """ Runs each test against the (emptied) PostgreSQL database of POSTGRES_TEST_URL.
+    """
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        self.database_url = POSTGRES_TEST_URL
+        engine = create_engine(model.normalize_url(self.database_url))
+        with engine.begin() as connection:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        model.Base.metadata.drop_all(engine)
+        engine.dispose()
@@ -1,7 +1,10 @@
 import unittest
+import gzip
 import json
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
+import utils.cache
 from app import create_app
 from model import Actor, Movie, ActorMovieAssociation
 from schemas.actor import *
@@ -39,6 +42,15 @@ class AppTests(unittest.TestCase):
     def tearDown(self):
         pass
 
+    #
+    # Startup
+    #
+    def test_create_app_does_not_connect(self):
+        # the engine is only created (and the database connected) by the first request using it
+        app = create_app({'DATABASE_URL': 'postgresql://nobody@invalid.invalid:1/nothing', 'ENABLE_AUTH': False})
+        res = app.test_client().get('/')
+        self.assertEqual(res.status_code, 302)
+
     #
     # GET
     #
@@ -56,6 +68,242 @@ class AppTests(unittest.TestCase):
             self.assertEqual(res.status_code, 200)
             self.assertEqual(type(data['movies']), type([]))
 
+    def test_get_actors_pagination(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?limit=1000', headers=self.auth_headers[role])
+        all_ids = [a['id'] for a in json.loads(res.data)['actors']]
+        # walks the list one actor at a time
+        ids = []
+        cursor = None
+        while True:
+            query = f'limit=1&cursor={cursor}' if cursor else 'limit=1'
+            res = self.client().get(f'/api/v1/actors?{query}', headers=self.auth_headers[role])
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            self.assertLessEqual(len(data['actors']), 1)
+            ids += [a['id'] for a in data['actors']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, all_ids)
+
+    def test_get_movies_pagination(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?limit=1', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data['movies']), 1)
+        res = self.client().get(f'/api/v1/movies?limit=1&cursor={data["next_cursor"]}', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(json.loads(res.data)['movies'][0]['id'], data['movies'][0]['id'])
+
+    def test_get_actors_stream(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?limit=1000', headers=self.auth_headers[role])
+        actors = json.loads(res.data)['actors']
+        res = self.client().get('/api/v1/actors?stream=1', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in res.data.decode().splitlines()], actors)
+
+    def test_get_movies_stream(self):
+        role = 'assistant'
+        headers = {**self.auth_headers[role], 'Accept': 'application/x-ndjson'}
+        res = self.client().get('/api/v1/movies', headers=headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/x-ndjson')
+        for line in res.data.decode().splitlines():
+            self.assertIn('title', json.loads(line))
+
+    def test_get_actor(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?limit=1', headers=self.auth_headers[role])
+        actor = json.loads(res.data)['actors'][0]
+        res = self.client().get(f'/api/v1/actors/{actor["id"]}', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.data), actor)
+        self.assertIn('max-age', res.headers['Cache-Control'])
+        self.assertIn('ETag', res.headers)
+
+    def test_get_actor_not_found(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors/100000000', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 404)
+
+    def test_get_movie(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?limit=1', headers=self.auth_headers[role])
+        movie = json.loads(res.data)['movies'][0]
+        res = self.client().get(f'/api/v1/movies/{movie["id"]}?fields=title', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.data), {'title': movie['title']})
+
+    def test_get_actors_by_ids(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?limit=3', headers=self.auth_headers[role])
+        actors = json.loads(res.data)['actors']
+        ids = ','.join(str(a['id']) for a in reversed(actors))
+        res = self.client().get(f'/api/v1/actors?ids={ids},100000000', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        # unknown ids are left out, and the actors come in id order
+        self.assertEqual(data['actors'], actors)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_get_movies_by_ids_invalid(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?ids=1,one', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_actors_not_modified(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        etag = res.headers['ETag']
+        res = self.client().get('/api/v1/actors', headers={**self.auth_headers[role], 'If-None-Match': etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_get_movies_modified(self):
+        role = 'producer'
+        res = self.client().get('/api/v1/movies', headers=self.auth_headers[role])
+        etag = res.headers['ETag']
+        # adds (and removes) a movie
+        movie = MoviePatchRepresentation(Movie(title=f'TestETagMovie-{role}', genre='Terror', release_date='1979-01-01'))
+        res = self.client().post(f'/api/v1/movies', data=movie, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        res = self.client().delete(f'/api/v1/movies/{data["id"]}', headers=self.auth_headers[role])
+        # the previous ETag no longer matches
+        res = self.client().get('/api/v1/movies', headers={**self.auth_headers[role], 'If-None-Match': etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res.headers['ETag'], etag)
+
+    def test_get_actors_cached(self):
+        role = 'director'
+        # the cache is only enabled by default with a backend shared by the processes
+        self.addCleanup(setattr, utils.cache, 'RESPONSE_CACHE_ENABLED', utils.cache.RESPONSE_CACHE_ENABLED)
+        utils.cache.RESPONSE_CACHE_ENABLED = True
+        res = self.client().get('/api/v1/actors?limit=2', headers=self.auth_headers[role])
+        res = self.client().get('/api/v1/actors?limit=2', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['X-Cache'], 'HIT')
+        cached_data = res.data
+        # adds (and removes) an actor: the cached response is invalidated
+        actor = ActorPatchRepresentation(Actor(name=f'TestCacheActor-{role}', gender='Male', birth_date='1979-01-01', nationality='Brazilian'))
+        res = self.client().post(f'/api/v1/actors', data=actor, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        res = self.client().delete(f'/api/v1/actors/{data["id"]}', headers=self.auth_headers[role])
+        res = self.client().get('/api/v1/actors?limit=2', headers=self.auth_headers[role])
+        self.assertEqual(res.headers['X-Cache'], 'MISS')
+        self.assertEqual(res.data, cached_data)
+
+    def test_get_actors_compressed(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors', headers=self.auth_headers[role])
+        data = res.data
+        res = self.client().get('/api/v1/actors', headers={**self.auth_headers[role], 'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res.headers['Vary'])
+        self.assertEqual(gzip.decompress(res.data), data)
+
+    def test_get_actors_invalid_cursor(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?cursor=INVALID', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_actors_fields(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?fields=id,name', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        for actor in data['actors']:
+            self.assertEqual(list(actor.keys()), ['id', 'name'])
+
+    def test_get_movies_fields_include_associations(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?fields=title&include=associations', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        for movie in data['movies']:
+            self.assertEqual(list(movie.keys()), ['title', 'assocations'])
+
+    def test_get_actors_filtered_sorted(self):
+        role = 'assistant'
+        # walks the female actors born since 1950, youngest first, two at a time
+        dates = []
+        cursor = None
+        while True:
+            query = 'gender=Female&birth_date_from=1950-01-01&sort=-birth_date&limit=2' + (f'&cursor={cursor}' if cursor else '')
+            res = self.client().get(f'/api/v1/actors?{query}', headers=self.auth_headers[role])
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            for actor in data['actors']:
+                self.assertEqual(actor['gender'], 'Female')
+            dates += [datetime.strptime(a['birth_date'], '%a, %d %b %Y %H:%M:%S %Z') for a in data['actors']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        for d in dates:
+            self.assertGreaterEqual(d, datetime(1950, 1, 1))
+
+    def test_get_movies_filtered(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?release_date_to=1999-12-31&sort=release_date', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        for movie in data['movies']:
+            self.assertLessEqual(datetime.strptime(movie['release_date'], '%a, %d %b %Y %H:%M:%S %Z'), datetime(1999, 12, 31))
+
+    def test_get_movies_range_requires_sort(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?release_date_to=1999-12-31&sort=genre', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_actors_invalid_sort(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?sort=salary', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_actors_invalid_fields(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?fields=id,salary', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_empty_fields(self):
+        role = 'assistant'
+        for path in ('/api/v1/actors?fields=', '/api/v1/actors?fields=,', '/api/v1/actors/1?fields=', '/api/v1/movies?fields=%20,', '/api/v1/movies/1?fields=,'):
+            res = self.client().get(path, headers=self.auth_headers[role])
+            self.assertEqual(res.status_code, 400, path)
+
+    def test_search_actors(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors?limit=1', headers=self.auth_headers[role])
+        actor = json.loads(res.data)['actors'][0]
+        res = self.client().get(f'/api/v1/actors/search?q={actor["name"]}', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['actors'][0]['id'], actor['id'])
+        ranks = [a['rank'] for a in data['actors']]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_search_movies_typeahead(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/movies?limit=1', headers=self.auth_headers[role])
+        movie = json.loads(res.data)['movies'][0]
+        prefix = movie['title'][:2]
+        res = self.client().get(f'/api/v1/movies/search?q={prefix}&typeahead=1', headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        for m in data['movies']:
+            self.assertTrue(m['title'].lower().startswith(prefix.lower()))
+
+    def test_search_actors_empty_query(self):
+        role = 'assistant'
+        res = self.client().get('/api/v1/actors/search?q=', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 422)
+
     #
     # PATCH
     #
@@ -121,6 +369,18 @@ class AppTests(unittest.TestCase):
             res = self.client().patch(f'/api/v1/movies/{random_movie["id"]}', data=movie, headers=self.auth_headers[role])
             self.assertEqual(res.status_code, 200)
 
+    def test_patch_movie_title_in_filmographies(self):
+        role = 'producer'
+        # movie 4 (Game Of Thrones) is in the filmography of actor 11
+        res = self.client().get('/api/v1/movies/4', headers=self.auth_headers[role])
+        original = json.loads(res.data)
+        for title in ['test_patch_movie_title', original['title']]:
+            movie = MoviePatchRepresentation(Movie(title=title, genre=original['genre'], release_date=original['release_date']))
+            res = self.client().patch('/api/v1/movies/4', data=movie, headers=self.auth_headers[role])
+            self.assertEqual(res.status_code, 200)
+            res = self.client().get('/api/v1/actors/11', headers=self.auth_headers[role])
+            self.assertIn([4, title, 'Tyrion Lannister'], json.loads(res.data)['assocations'])
+
     def test_patch_movie_not_found(self):
         for role in ['director', 'producer']:
             random_id = 999999
@@ -176,6 +436,81 @@ class AppTests(unittest.TestCase):
         res = self.client().delete(f'/api/v1/movies/{data["id"]}', headers=self.auth_headers[role])
         self.assertEqual(res.status_code, 200)
  
+    def test_post_actors_bulk(self):
+        role = 'director'
+        actors = [
+            {'name': 'TestBulkActor-1', 'gender': 'Male', 'birth_date': '1979-01-01', 'nationality': 'Brazilian'},
+            {'name': 'TestBulkActor-2', 'gender': 'Female', 'birth_date': '1981-02-03', 'nationality': 'Brazilian'},
+            {'name': 'TestBulkActor-1', 'gender': 'Male', 'birth_date': '1979-01-01', 'nationality': 'Brazilian'},
+            {'name': 'TestBulkActor-3', 'gender': 'Male', 'birth_date': 'INVALID_DATE', 'nationality': 'Brazilian'}
+        ]
+        res = self.client().post('/api/v1/actors/bulk', json={'actors': actors}, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['created'], 2)
+        self.assertEqual(data['failed'], 2)
+        self.assertIn('error', data['results'][2])
+        self.assertIn('error', data['results'][3])
+        # and removes them afterwards
+        for result in data['results'][:2]:
+            res = self.client().delete(f'/api/v1/actors/{result["id"]}', headers=self.auth_headers[role])
+            self.assertEqual(res.status_code, 200)
+
+    def test_post_actors_bulk_not_authorized(self):
+        role = 'assistant'
+        actors = [{'name': 'FailedBulkActor', 'gender': 'Male', 'birth_date': '1979-01-01', 'nationality': 'Brazilian'}]
+        res = self.client().post('/api/v1/actors/bulk', json={'actors': actors}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 403)
+
+    def test_post_movies_bulk(self):
+        role = 'producer'
+        movies = [{'title': f'TestBulkMovie-{i}', 'genre': 'Terror', 'release_date': '1979-01-01'} for i in range(3)]
+        res = self.client().post('/api/v1/movies/bulk', json={'movies': movies}, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['created'], 3)
+        # and removes them afterwards
+        for result in data['results']:
+            res = self.client().delete(f'/api/v1/movies/{result["id"]}', headers=self.auth_headers[role])
+            self.assertEqual(res.status_code, 200)
+
+    def test_post_actor_movie_bulk(self):
+        role = 'producer'
+        associations = [
+            {'actor_id': 5, 'movie_id': 4, 'character_name': 'test_post_actor_movie_bulk'},
+            {'actor_id': 999, 'movie_id': 4, 'character_name': 'test_post_actor_movie_bulk'}
+        ]
+        res = self.client().post('/api/v1/actor-movie/bulk', json={'associations': associations}, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['results'][1]['error'], 'actor not found.')
+        # and delete afterwards
+        res = self.client().delete(f'/api/v1/actor-movie', data=associations[0], headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+
+    def test_batch(self):
+        role = 'producer'
+        actor_movie = {'actor_id': 5, 'movie_id': 4, 'character_name': 'test_batch'}
+        operations = [
+            {'method': 'POST', 'path': '/api/v1/actor-movie', 'form': actor_movie},
+            {'method': 'DELETE', 'path': '/api/v1/actor-movie', 'form': actor_movie}
+        ]
+        res = self.client().post('/api/v1/batch', json={'operations': operations}, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [200, 200])
+
+    def test_batch_not_authorized(self):
+        role = 'assistant'
+        operations = [{'method': 'POST', 'path': '/api/v1/actor-movie', 'form': {'actor_id': 5, 'movie_id': 4, 'character_name': 'test_batch'}}]
+        res = self.client().post('/api/v1/batch', json={'operations': operations}, headers=self.auth_headers[role])
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(data['committed'])
+        self.assertEqual(data['results'][0]['status'], 403)
+
     def test_post_actor_movie_not_authorized(self):
         role = 'assistant'
         actor_movie = ActorMovieRepresentation(ActorMovieAssociation(actor_id=99999, movie_id=99999, character_name='any'))
@@ -204,6 +539,45 @@ class AppTests(unittest.TestCase):
             res = self.client().post(f'/api/v1/actor-movie', data=actor_movie, headers=self.auth_headers[role])
             self.assertEqual(res.status_code, 422)
         
+    #
+    # PUT
+    #
+    def test_put_movie_cast(self):
+        role = 'producer'
+        # adds a movie with a cast
+        movie = MoviePatchRepresentation(Movie(title=f'TestCastMovie-{role}', genre='Terror', release_date='1979-01-01'))
+        res = self.client().post(f'/api/v1/movies', data=movie, headers=self.auth_headers[role])
+        movie_id = json.loads(res.data)['id']
+        cast = [{'actor_id': 1, 'character_name': 'first'}, {'actor_id': 2, 'character_name': 'second'}]
+        res = self.client().put(f'/api/v1/movies/{movie_id}/cast', json={'cast': cast}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(a[0] for a in json.loads(res.data)['assocations']), [1, 2])
+        # replaces it: one actor removed, one renamed, one added
+        cast = [{'actor_id': 2, 'character_name': 'renamed'}, {'actor_id': 3, 'character_name': 'third'}]
+        res = self.client().put(f'/api/v1/movies/{movie_id}/cast', json={'cast': cast}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted((a[0], a[2]) for a in json.loads(res.data)['assocations']), [(2, 'renamed'), (3, 'third')])
+        # and removes everything afterwards
+        res = self.client().put(f'/api/v1/movies/{movie_id}/cast', json={'cast': []}, headers=self.auth_headers[role])
+        self.assertEqual(json.loads(res.data)['assocations'], [])
+        res = self.client().delete(f'/api/v1/movies/{movie_id}', headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 200)
+
+    def test_put_movie_cast_not_authorized(self):
+        role = 'assistant'
+        res = self.client().put('/api/v1/movies/1/cast', json={'cast': []}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 403)
+
+    def test_put_movie_cast_not_found(self):
+        role = 'producer'
+        res = self.client().put('/api/v1/movies/999999/cast', json={'cast': []}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 404)
+
+    def test_put_movie_cast_invalid_actor(self):
+        role = 'producer'
+        res = self.client().put('/api/v1/movies/1/cast', json={'cast': [{'actor_id': 999999, 'character_name': 'any'}]}, headers=self.auth_headers[role])
+        self.assertEqual(res.status_code, 422)
+
     #
     # DELETE
     #    
@@ -0,0 +1,203 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask
+from jose import jwk, jwt
+
+import auth.auth
+from auth.auth import requires_auth
+from auth.jwks import JWKSKeyStore, parse_max_age
+from auth.token_cache import TokenCache
+
+#
+# Helpers
+#
+def generate_key(kid):
+    """ Returns a (private PEM, public JWK) pair.
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+    public_jwk = jwk.construct(pem, 'RS256').public_key().to_dict()
+    public_jwk.update({'kid': kid, 'use': 'sig'})
+    return pem, public_jwk
+
+def write_jwks(path, keys):
+    with open(path, 'w') as f:
+        f.write(json.dumps({'keys': keys}))
+
+#
+# Test Class
+#
+class JWKSKeyStoreTests(unittest.TestCase):
+
+    # runs once before all test methods
+    @classmethod
+    def setUpClass(self):
+        self.pem, self.public_jwk = generate_key('key-1')
+        self.rotated_pem, self.rotated_jwk = generate_key('key-2')
+
+    # runs before each test
+    def setUp(self):
+        fd, self.jwks_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        write_jwks(self.jwks_path, [self.public_jwk])
+
+    # runs after each test
+    def tearDown(self):
+        os.remove(self.jwks_path)
+
+    def test_parse_max_age(self):
+        self.assertEqual(parse_max_age('public, max-age=86400, stale-while-revalidate=60'), 86400)
+        self.assertEqual(parse_max_age('no-store'), 0)
+        self.assertIsNone(parse_max_age('public'))
+        self.assertIsNone(parse_max_age(None))
+
+    def test_keys_are_cached(self):
+        store = JWKSKeyStore(self.jwks_path, ttl=600)
+        for _ in range(5):
+            self.assertEqual(store.get_key('key-1')['n'], self.public_jwk['n'])
+        self.assertEqual(store.fetches, 1)
+
+    def test_file_url(self):
+        store = JWKSKeyStore(f'file://{self.jwks_path}')
+        self.assertIsNotNone(store.get_key('key-1'))
+
+    def test_decode_with_cached_key(self):
+        store = JWKSKeyStore(self.jwks_path)
+        token = jwt.encode({'sub': 'tester'}, self.pem, algorithm='RS256', headers={'kid': 'key-1'})
+        payload = jwt.decode(token, store.get_key('key-1'), algorithms=['RS256'])
+        self.assertEqual(payload['sub'], 'tester')
+
+    def test_unknown_kid_refreshes(self):
+        store = JWKSKeyStore(self.jwks_path, min_refresh_interval=0)
+        self.assertIsNotNone(store.get_key('key-1'))
+        write_jwks(self.jwks_path, [self.public_jwk, self.rotated_jwk])
+        self.assertIsNotNone(store.get_key('key-2'))
+        self.assertEqual(store.fetches, 2)
+
+    def test_unknown_kid_refresh_is_rate_limited(self):
+        store = JWKSKeyStore(self.jwks_path, min_refresh_interval=60)
+        self.assertIsNotNone(store.get_key('key-1'))
+        for _ in range(5):
+            self.assertIsNone(store.get_key('unknown'))
+        self.assertEqual(store.fetches, 1)
+
+    def test_stale_keys_are_served_while_revalidating(self):
+        store = JWKSKeyStore(self.jwks_path, ttl=0, stale_ttl=60, min_refresh_interval=0)
+        self.assertIsNotNone(store.get_key('key-1'))
+        # the issuer becomes unreachable: the stale key set is still served
+        os.remove(self.jwks_path)
+        self.assertIsNotNone(store.get_key('key-1'))
+        deadline = time.monotonic() + 5
+        while store.fetch_errors == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(store.fetch_errors, 1)
+        self.assertIsNotNone(store.get_key('key-1'))
+        write_jwks(self.jwks_path, [self.public_jwk])
+
+    def test_concurrent_cold_start_fetches_once(self):
+        store = JWKSKeyStore(self.jwks_path)
+        read = store._read
+
+        def slow_read():
+            time.sleep(0.2)
+            return read()
+
+        store._read = slow_read
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.get_key('key-1'))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(key is not None for key in results))
+        self.assertEqual(store.fetches, 1)
+
+    def test_failed_cold_start_is_rate_limited(self):
+        os.remove(self.jwks_path)
+        try:
+            store = JWKSKeyStore(self.jwks_path, min_refresh_interval=60)
+            for _ in range(5):
+                self.assertIsNone(store.get_key('key-1'))
+            self.assertEqual(store.fetches, 1)
+        finally:
+            write_jwks(self.jwks_path, [self.public_jwk])
+
+class TokenCacheTests(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = TokenCache(max_size=10)
+        self.assertIsNone(cache.get('token'))
+        cache.put('token', {'sub': 'tester', 'exp': time.time() + 60})
+        self.assertEqual(cache.get('token')['sub'], 'tester')
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_expired_tokens_are_evicted(self):
+        cache = TokenCache(max_size=10)
+        cache.put('expired', {'exp': time.time() - 1})
+        self.assertIsNone(cache.get('expired'))
+        cache.put('expiring', {'exp': time.time() + 0.05})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('expiring'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_max_ttl(self):
+        cache = TokenCache(max_size=10, max_ttl=0.05)
+        cache.put('no-exp', {'sub': 'tester'})
+        cache.put('long-lived', {'sub': 'tester', 'exp': time.time() + 3600})
+        self.assertIsNotNone(cache.get('no-exp'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('no-exp'))
+        self.assertIsNone(cache.get('long-lived'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2)
+        cache.put('a', {'sub': 'a'})
+        cache.put('b', {'sub': 'b'})
+        cache.get('a')
+        cache.put('c', {'sub': 'c'})
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_disabled(self):
+        cache = TokenCache(enabled=False)
+        cache.put('token', {'sub': 'tester'})
+        self.assertIsNone(cache.get('token'))
+
+    def test_requires_auth_skips_verification_of_cached_tokens(self):
+        pem, public_jwk = generate_key('key-1')
+        fd, jwks_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        write_jwks(jwks_path, [public_jwk])
+        try:
+            claims = {'iss': 'https://issuer.test/', 'aud': 'fsnd-capstone', 'exp': int(time.time()) + 60, 'permissions': ['view:actors']}
+            token = jwt.encode(claims, pem, algorithm='RS256', headers={'kid': 'key-1'})
+
+            app = Flask(__name__)
+            settings = auth.auth.configure(app, 'issuer.test', 'fsnd-capstone', ['RS256'], jwks_path)
+            @app.get('/protected')
+            @requires_auth('view:actors')
+            def protected():
+                return {'ok': True}
+
+            client = app.test_client()
+            for _ in range(3):
+                res = client.get('/protected', headers={'Authorization': f'Bearer {token}'})
+                self.assertEqual(res.status_code, 200)
+            self.assertEqual(settings.token_cache.stats(), {'size': 1, 'hits': 2, 'misses': 1})
+        finally:
+            os.remove(jwks_path)
+
+#
+# Main
+#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from model import Actor, Movie, ActorMovieAssociation
+from tests.helpers import AppTestCase, actor, count, create_database, movie
+
+# operations: an actor creation, an association, and the same association again (which fails)
+OPERATIONS = [
+    {"method": 'POST', "path": '/api/v1/actors/bulk', "body": {"actors": [{"name": 'Actor 2', "gender": 'Male', "birth_date": '1990-01-01', "nationality": 'French'}]}},
+    {"method": 'POST', "path": '/api/v1/actor-movie', "form": {"actor_id": 1, "movie_id": 1, "character_name": 'Lead'}},
+    {"method": 'POST', "path": '/api/v1/actor-movie', "form": {"actor_id": 1, "movie_id": 1, "character_name": 'Lead'}},
+]
+
+#
+# Test Class
+#
+class BatchTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        create_database(self.database_url, actors=[actor('Actor 1')], movies=[movie('Movie 1')])
+        self.app = self.create_app()
+        self.client = self.app.test_client()
+
+    def test_batch(self):
+        etag = self.client.get('/api/v1/actors').headers['ETag']
+        res = self.client.post('/api/v1/batch', json={"operations": OPERATIONS[:2]})
+        data = res.get_json()
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [200, 200])
+        self.assertEqual(data['results'][1]['body'], {"actor_id": 1, "movie_id": 1, "character_name": 'Lead'})
+        self.assertEqual((count(self.app, Actor), count(self.app, ActorMovieAssociation)), (2, 1))
+        # the versions of the modified collections are bumped
+        self.assertNotEqual(self.client.get('/api/v1/actors').headers['ETag'], etag)
+
+    def test_atomic_batch_failure(self):
+        etag = self.client.get('/api/v1/actors').headers['ETag']
+        res = self.client.post('/api/v1/batch', json={"operations": OPERATIONS + [{"method": 'DELETE', "path": '/api/v1/movies/1'}]})
+        data = res.get_json()
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(data['committed'])
+        # the operation following the failed one is not run
+        self.assertEqual([result['status'] for result in data['results']], [200, 200, 422, 424])
+        self.assertEqual((count(self.app, Actor), count(self.app, Movie), count(self.app, ActorMovieAssociation)), (1, 1, 0))
+        self.assertEqual(self.client.get('/api/v1/actors').headers['ETag'], etag)
+
+    def test_non_atomic_batch(self):
+        res = self.client.post('/api/v1/batch', json={"operations": OPERATIONS + [{"method": 'DELETE', "path": '/api/v1/movies/99'}], "atomic": False})
+        data = res.get_json()
+        self.assertTrue(data['committed'])
+        self.assertEqual([result['status'] for result in data['results']], [200, 200, 422, 404])
+        self.assertEqual((count(self.app, Actor), count(self.app, ActorMovieAssociation)), (2, 1))
+
+    def test_invalid_operations(self):
+        res = self.client.post('/api/v1/batch', json={"operations": [{"method": 'GET', "path": '/api/v1/actors'}]})
+        self.assertEqual(res.status_code, 422)
+        res = self.client.post('/api/v1/batch', json={"operations": [{"method": 'POST', "path": '/api/v1/batch', "body": {"operations": []}},
+                                                                     {"method": 'PUT', "path": '/api/v1/unknown'}], "atomic": False})
+        self.assertEqual([result['status'] for result in res.get_json()['results']], [400, 404])
+        res = self.client.post('/api/v1/batch', json={"operations": [OPERATIONS[1]] * 1001})
+        self.assertEqual(res.status_code, 413)
+
+class BatchAuthTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        create_database(self.database_url, actors=[actor('Actor 1')], movies=[movie('Movie 1')])
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+        public_jwk = jwk.construct(self.pem, 'RS256').public_key().to_dict()
+        public_jwk.update({'kid': 'key-1', 'use': 'sig'})
+        jwks_path = os.path.join(self.directory.name, 'jwks.json')
+        with open(jwks_path, 'w') as f:
+            f.write(json.dumps({'keys': [public_jwk]}))
+        self.app = self.create_app({"ENABLE_AUTH": True, "AUTH0_DOMAIN": 'issuer.test', "API_AUDIENCE": 'fsnd-capstone', "ALGORITHMS": ['RS256'], "JWKS_URL": jwks_path})
+        self.client = self.app.test_client()
+
+    def token(self, permissions):
+        claims = {'iss': 'https://issuer.test/', 'aud': 'fsnd-capstone', 'exp': int(time.time()) + 60, 'permissions': permissions}
+        return jwt.encode(claims, self.pem, algorithm='RS256', headers={'kid': 'key-1'})
+
+    def test_missing_token(self):
+        res = self.client.post('/api/v1/batch', json={"operations": OPERATIONS[:1]})
+        self.assertEqual(res.status_code, 401)
+
+    def test_permissions(self):
+        # the token is verified once, and each operation requires its endpoint's permission
+        headers = {'Authorization': f'Bearer {self.token(["post:actors"])}'}
+        res = self.client.post('/api/v1/batch', json={"operations": OPERATIONS[:2], "atomic": False}, headers=headers)
+        data = res.get_json()
+        self.assertEqual([result['status'] for result in data['results']], [200, 403])
+        self.assertEqual(self.app.extensions['auth'].token_cache.stats()['misses'], 1)
+        self.assertEqual((count(self.app, Actor), count(self.app, ActorMovieAssociation)), (2, 0))
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+import utils.backends
+import utils.cache
+from tests.helpers import keep_settings
+from utils.backends import MemoryBackend, SQLiteBackend
+from utils.cache import cache_enabled
+
+#
+# Test Class
+#
+class CacheTests(unittest.TestCase):
+
+    # runs before each test
+    def setUp(self):
+        keep_settings(self, utils.cache, 'RESPONSE_CACHE_ENABLED')
+        keep_settings(self, utils.backends, 'backend')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_enabled_by_default_with_shared_backend(self):
+        utils.cache.RESPONSE_CACHE_ENABLED = None
+        # the cache of a single process would not be invalidated by the writes of the other processes
+        utils.backends.backend = MemoryBackend()
+        self.assertFalse(cache_enabled())
+        utils.backends.backend = SQLiteBackend(os.path.join(self.directory.name, 'cache.db'))
+        self.assertTrue(cache_enabled())
+        # RESPONSE_CACHE_ENABLED overrides the default
+        utils.cache.RESPONSE_CACHE_ENABLED = False
+        self.assertFalse(cache_enabled())
+        utils.cache.RESPONSE_CACHE_ENABLED = True
+        utils.backends.backend = MemoryBackend()
+        self.assertTrue(cache_enabled())
@@ -0,0 +1,123 @@
+import datetime
+import gzip
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import utils.backends
+import utils.cache
+import utils.compression
+import utils.streaming
+from tests.helpers import AppTestCase, actor, create_database, keep_settings, movie
+from utils.backends import MemoryBackend, SQLiteBackend
+from utils.compression import brotli
+
+#
+# Helpers
+#
+def decompress(res):
+    """ Returns the decompressed body of a response.
+    """
+    encoding = res.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(res.data)
+    if encoding == 'br':
+        return brotli.decompress(res.data)
+    return res.data
+
+#
+# Test Class
+#
+class CompressionTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        keep_settings(self, utils.compression, 'COMPRESSION_ENABLED', 'COMPRESSION_MIN_SIZE', 'COMPRESSION_LEVEL')
+        keep_settings(self, utils.backends, 'backend')
+        utils.backends.backend = MemoryBackend()
+        create_database(self.database_url, actors=[actor(f'Actor {i}', birth_date=datetime.date(1950 + i % 50, 1, 1)) for i in range(100)],
+                        movies=[movie(f'Movie {i}', release_date=datetime.date(1990, 1, 1 + i % 28)) for i in range(100)])
+        self.client = self.create_app().test_client()
+
+    def test_negotiation(self):
+        identity = self.client.get('/api/v1/actors')
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertIn('Accept-Encoding', identity.headers['Vary'])
+        preferred = 'br' if brotli is not None else 'gzip'
+        cases = [('gzip', 'gzip'), ('gzip, br', preferred), ('*', preferred), ('br;q=0.5, gzip', 'gzip'), ('gzip;q=0', None), ('identity', None)]
+        for accept_encoding, encoding in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                res = self.client.get('/api/v1/actors', headers={'Accept-Encoding': accept_encoding})
+                self.assertEqual(res.headers.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', res.headers['Vary'])
+                self.assertEqual(int(res.headers['Content-Length']), len(res.data))
+                self.assertEqual(decompress(res), identity.data)
+                if encoding is not None:
+                    self.assertLess(len(res.data), len(identity.data) / 4)
+                    # each encoding is a different representation, with its own ETag
+                    self.assertNotEqual(res.headers['ETag'], identity.headers['ETag'])
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        res = self.client.get('/api/v1/movies', headers={'Accept-Encoding': 'br'})
+        self.assertEqual(res.headers['Content-Encoding'], 'br')
+        self.assertEqual(decompress(res), self.client.get('/api/v1/movies').data)
+
+    def test_settings(self):
+        # small responses are not worth compressing
+        res = self.client.get('/api/v1/actors/1', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', res.headers)
+        utils.compression.COMPRESSION_MIN_SIZE = 0
+        res = self.client.get('/api/v1/actors/1', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+        sizes = []
+        for level in (1, 9):
+            utils.compression.COMPRESSION_LEVEL = level
+            res = self.client.get('/api/v1/actors', headers={'Accept-Encoding': 'gzip'})
+            sizes.append(len(res.data))
+        self.assertLess(sizes[1], sizes[0])
+        utils.compression.COMPRESSION_ENABLED = False
+        res = self.client.get('/api/v1/actors', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', res.headers)
+        self.assertNotIn('Accept-Encoding', res.headers.get('Vary', ''))
+
+    def test_streaming(self):
+        identity = self.client.get('/api/v1/actors?stream=true').data
+        with mock.patch.object(utils.streaming, 'STREAM_CHUNK_SIZE', 1024):
+            res = self.client.get('/api/v1/actors?stream=true', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+            self.assertEqual(res.headers['Content-Encoding'], 'gzip')
+            self.assertNotIn('Content-Length', res.headers)
+            # each chunk is flushed: the rows it holds can be decompressed as soon as it is received
+            decompressor = zlib.decompressobj(31)
+            chunks = [decompressor.decompress(chunk) for chunk in res.response]
+            res.close()
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(chunk.endswith(b'\n') for chunk in chunks[:-1]))
+        self.assertEqual(b''.join(chunks), identity)
+
+    def test_cached_responses(self):
+        utils.cache.RESPONSE_CACHE_ENABLED = True
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in (MemoryBackend(), SQLiteBackend(os.path.join(directory, 'cache.db'))):
+                utils.backends.backend = backend
+                with self.subTest(backend=type(backend).__name__):
+                    gzip_compress = mock.Mock(wraps=utils.compression.gzip_compress)
+                    with mock.patch.dict(utils.compression.ENCODERS, {'gzip': (gzip_compress, utils.compression.GzipStream)}):
+                        miss = self.client.get('/api/v1/movies', headers={'Accept-Encoding': 'gzip'})
+                        hit = self.client.get('/api/v1/movies', headers={'Accept-Encoding': 'gzip'})
+                    # the compressed body is cached: the hit is not compressed again
+                    self.assertEqual(gzip_compress.call_count, 1)
+                    self.assertEqual((miss.headers['X-Cache'], hit.headers['X-Cache']), ('MISS', 'HIT'))
+                    self.assertEqual(hit.headers['Content-Encoding'], 'gzip')
+                    self.assertIn('Accept-Encoding', hit.headers['Vary'])
+                    self.assertEqual(hit.headers['ETag'], miss.headers['ETag'])
+                    self.assertEqual(hit.data, miss.data)
+                    # clients which do not accept the encoding get their own cache entry
+                    identity = self.client.get('/api/v1/movies')
+                    self.assertEqual(identity.headers['X-Cache'], 'MISS')
+                    self.assertNotIn('Content-Encoding', identity.headers)
+                    self.assertEqual(decompress(hit), identity.data)
+                    self.assertEqual(self.client.get('/api/v1/movies').data, identity.data)
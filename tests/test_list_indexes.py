@@ -0,0 +1,88 @@
+import datetime
+import itertools
+from sqlalchemy import create_engine, event, text
+
+from tests.helpers import PostgresTestCase, actor, create_database, movie
+
+#
+# Test Class
+#
+class ListIndexTests(PostgresTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        # the filtered values are rare enough for their indexes to be worth it, whatever the order
+        create_database(self.database_url,
+                        actors=[actor(f'Actor {i}', gender='Female' if i % 20 == 0 else 'Male', nationality='British' if i % 30 == 0 else 'American',
+                                      birth_date=datetime.date(1900, 1, 1) + datetime.timedelta(days=i * 7)) for i in range(20000)],
+                        movies=[movie(f'Movie {i}', genre='Western' if i % 50 == 0 else 'Drama', release_date=datetime.date(1900, 1, 1) + datetime.timedelta(days=i * 7))
+                                for i in range(20000)])
+        engine = create_engine(self.database_url)
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+        engine.dispose()
+        self.app = self.create_app()
+        self.client = self.app.test_client()
+
+    def plan(self, path):
+        """ Returns the plan of the list query of a request (the planner avoiding sorts at all costs).
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        engine = self.app.extensions['database'].engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            res = self.client.get(path)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(res.status_code, 200)
+        statement, parameters = statements[-1]
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SET enable_sort = off')
+            cursor.execute(f'EXPLAIN {statement}', parameters)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+        finally:
+            connection.close()
+
+    def assertIndexed(self, path):
+        plan = self.plan(path)
+        # the index serves both the filters and the order
+        self.assertNotIn('Sort', plan)
+        self.assertNotIn('Filter', plan)
+
+    def test_actor_lists(self):
+        filters = ['gender=Female', 'nationality=British']
+        for count in range(len(filters) + 1):
+            for selected in itertools.combinations(filters, count):
+                for sort in ['id', '-id', 'gender', '-gender', 'nationality', '-nationality', 'birth_date', '-birth_date']:
+                    path = '/api/v1/actors?' + '&'.join(['fields=id', *selected, f'sort={sort}'])
+                    with self.subTest(path=path):
+                        self.assertIndexed(path)
+                # date ranges, sorted by date
+                for sort in ['birth_date', '-birth_date']:
+                    path = '/api/v1/actors?' + '&'.join(['fields=id', *selected, 'birth_date_from=1960-01-01', 'birth_date_to=1961-12-31', f'sort={sort}'])
+                    with self.subTest(path=path):
+                        self.assertIndexed(path)
+
+    def test_movie_lists(self):
+        for selected in [[], ['genre=Western']]:
+            for sort in ['id', '-id', 'genre', '-genre', 'release_date', '-release_date']:
+                path = '/api/v1/movies?' + '&'.join(['fields=id', *selected, f'sort={sort}'])
+                with self.subTest(path=path):
+                    self.assertIndexed(path)
+            for sort in ['release_date', '-release_date']:
+                path = '/api/v1/movies?' + '&'.join(['fields=id', *selected, 'release_date_from=1960-01-01', 'release_date_to=1961-12-31', f'sort={sort}'])
+                with self.subTest(path=path):
+                    self.assertIndexed(path)
+
+    def test_unindexed_orders_rejected(self):
+        for path in ['/api/v1/actors?birth_date_from=1960-01-01', '/api/v1/actors?gender=Female&birth_date_to=1970-12-31&sort=gender',
+                     '/api/v1/movies?release_date_from=1960-01-01&sort=genre', '/api/v1/movies?release_date_to=1970-12-31&sort=-id']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 400)
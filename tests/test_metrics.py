@@ -0,0 +1,29 @@
+import unittest
+from flask import Flask
+
+from utils.metrics import instrument_app, render_metrics
+
+#
+# Test Class
+#
+class MetricsTests(unittest.TestCase):
+
+    def test_request_metrics(self):
+        app = Flask(__name__)
+        instrument_app(app)
+
+        @app.route('/metrics-test/<int:n>')
+        def sized(n):
+            return 'x' * n
+
+        client = app.test_client()
+        client.get('/metrics-test/3')
+        client.get('/metrics-test/4')
+        client.get('/missing')
+        body, content_type = render_metrics()
+        body = body.decode()
+        self.assertTrue(content_type.startswith('text/plain'))
+        self.assertIn('http_requests_total{method="GET",route="/metrics-test/<int:n>",status="200"} 2.0', body)
+        self.assertIn('http_requests_total{method="GET",route="unmatched",status="404"} 1.0', body)
+        self.assertIn('http_response_bytes_total{method="GET",route="/metrics-test/<int:n>"} 7.0', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/metrics-test/<int:n>"} 2.0', body)
@@ -0,0 +1,45 @@
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, String, Table, create_engine, inspect, insert, select
+
+from tests.helpers import AppTestCase
+
+# the tables as the earlier versions of the application created them (with Base.metadata.create_all, when it started)
+previous_metadata = MetaData()
+Table('actor', previous_metadata, Column('id', Integer, primary_key=True), Column('name', String, unique=True), Column('gender', String),
+      Column('birth_date', Date), Column('nationality', String))
+Table('movie', previous_metadata, Column('id', Integer, primary_key=True), Column('title', String, unique=True), Column('genre', String),
+      Column('release_date', Date))
+Table('actor_movie_association', previous_metadata, Column('actor_id', Integer, ForeignKey('actor.id'), primary_key=True),
+      Column('movie_id', Integer, ForeignKey('movie.id'), primary_key=True), Column('character_name', String, nullable=False))
+
+#
+# Test Class
+#
+class MigrationTests(AppTestCase):
+
+    def upgrade(self):
+        # (without alembic.ini, whose logging configuration would replace the one of the tests)
+        config = Config()
+        config.set_main_option('script_location', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'))
+        config.set_main_option('sqlalchemy.url', self.database_url)
+        command.upgrade(config, 'head')
+
+    def test_empty_database(self):
+        self.upgrade()
+        engine = create_engine(self.database_url)
+        self.assertLessEqual({'actor', 'movie', 'actor_movie_association'}, set(inspect(engine).get_table_names()))
+        engine.dispose()
+
+    def test_database_created_by_previous_versions(self):
+        engine = create_engine(self.database_url)
+        previous_metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(previous_metadata.tables['actor']), [{"name": 'Actor 1'}])
+        self.upgrade()
+        with engine.connect() as connection:
+            columns = {column['name'] for column in inspect(connection).get_columns('actor')}
+            self.assertIn('filmography', columns)
+            self.assertEqual(connection.execute(select(previous_metadata.tables['actor'].c.name)).scalars().all(), ['Actor 1'])
+        engine.dispose()
@@ -0,0 +1,98 @@
+import threading
+import time
+from sqlalchemy import insert
+
+import model
+from model import ActorMovieAssociation, Movie, projections
+from model.projections import refresh_projections
+from tests.helpers import AppTestCase, PostgresTestCase, actor, create_database, keep_settings, movie
+
+#
+# Test Class
+#
+class ProjectionTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        keep_settings(self, projections, 'DENORMALIZED_READS')
+        # three actors and two movies
+        create_database(self.database_url, actors=[actor(f'Actor {i}', id=i) for i in (1, 2, 3)], movies=[movie(f'Movie {i}', id=i) for i in (1, 2)])
+        self.app = self.create_app()
+        self.client = self.app.test_client()
+
+    def associations(self):
+        """ Returns the associations of the actors and movies, as read from the projections and from the association table.
+        """
+        results = []
+        denormalized_reads = projections.DENORMALIZED_READS
+        for denormalized in (True, False):
+            projections.DENORMALIZED_READS = denormalized
+            actors = {a['id']: sorted(a['assocations']) for a in self.client.get('/api/v1/actors').get_json()['actors']}
+            movies = {m['id']: sorted(m['assocations']) for m in self.client.get('/api/v1/movies').get_json()['movies']}
+            results.append((actors, movies))
+        projections.DENORMALIZED_READS = denormalized_reads
+        return results
+
+    def test_writes_maintain_projections(self):
+        res = self.client.post('/api/v1/actor-movie/bulk', json={'associations': [{'actor_id': 1, 'movie_id': 1, 'character_name': 'Lead'},
+                                                                                  {'actor_id': 2, 'movie_id': 1, 'character_name': 'Villain'}]})
+        self.assertEqual(res.get_json()['created'], 2)
+        res = self.client.post('/api/v1/actor-movie', data={'actor_id': 1, 'movie_id': 2, 'character_name': 'Cameo'})
+        self.assertEqual(res.status_code, 200)
+        denormalized, joined = self.associations()
+        self.assertEqual(denormalized, joined)
+        self.assertEqual(denormalized[0][1], [[1, 'Movie 1', 'Lead'], [2, 'Movie 2', 'Cameo']])
+        self.assertEqual(denormalized[1][1], [[1, 'Actor 1', 'Lead'], [2, 'Actor 2', 'Villain']])
+        # the cast replacement removes, renames and adds characters
+        res = self.client.put('/api/v1/movies/1/cast', json={'cast': [{'actor_id': 2, 'character_name': 'Hero'}, {'actor_id': 3, 'character_name': 'Sidekick'}]})
+        self.assertEqual(sorted(res.get_json()['assocations']), [[2, 'Actor 2', 'Hero'], [3, 'Actor 3', 'Sidekick']])
+        res = self.client.delete('/api/v1/actor-movie', data={'actor_id': 1, 'movie_id': 2})
+        self.assertEqual(res.status_code, 200)
+        denormalized, joined = self.associations()
+        self.assertEqual(denormalized, joined)
+        self.assertEqual(denormalized[0][1], [])
+        self.assertEqual(denormalized[0][3], [[1, 'Movie 1', 'Sidekick']])
+
+    def test_rebuild(self):
+        # associations written outside of the API leave the projections behind, until they are rebuilt
+        with self.app.extensions['database'].engine.begin() as connection:
+            connection.execute(insert(ActorMovieAssociation), [{'actor_id': 3, 'movie_id': 2, 'character_name': 'Lead'}])
+        denormalized, joined = self.associations()
+        self.assertNotEqual(denormalized, joined)
+        result = self.app.test_cli_runner().invoke(args=['rebuild-projections'])
+        self.assertIn('3 actors and the cast of 2 movies', result.output)
+        denormalized, joined = self.associations()
+        self.assertEqual(denormalized, joined)
+        self.assertEqual(denormalized[1][2], [[3, 'Actor 3', 'Lead']])
+
+class ProjectionLockTests(PostgresTestCase):
+
+    def test_concurrent_refreshes(self):
+        create_database(self.database_url, actors=[actor(f'Actor {i}', id=i) for i in (1, 2)], movies=[movie('Movie 1', id=1)])
+        database = model.Database(self.database_url)
+        self.addCleanup(database.dispose)
+        first, second = database.session(), database.session()
+        # two transactions adding an actor to the same cast
+        first.add(ActorMovieAssociation(actor_id=1, movie_id=1, character_name='Lead'))
+        first.flush()
+        refresh_projections(first, actor_ids=[1], movie_ids=[1])
+
+        def add_second_actor():
+            second.add(ActorMovieAssociation(actor_id=2, movie_id=1, character_name='Villain'))
+            second.flush()
+            refresh_projections(second, actor_ids=[2], movie_ids=[1])
+            second.commit()
+
+        thread = threading.Thread(target=add_second_actor)
+        thread.start()
+        time.sleep(0.5)
+        # the second refresh waits for the first transaction, and then reads its association
+        self.assertTrue(thread.is_alive())
+        first.commit()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        session = database.session()
+        self.assertEqual(session.get(Movie, 1).cast, [[1, 'Actor 1', 'Lead'], [2, 'Actor 2', 'Villain']])
+        for s in (first, second, session):
+            s.close()
@@ -0,0 +1,74 @@
+import unittest
+from flask import Flask
+from sqlalchemy import Column, Date, MetaData, Table, create_engine, insert, text
+
+import utils.instrumentation
+from model.queries import QueryRecorder, instrument_queries, start_recording, stop_recording, statement_shape
+from utils.instrumentation import instrument_requests
+
+#
+# Test Class
+#
+class QueryRecorderTests(unittest.TestCase):
+
+    # runs before each test
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        instrument_queries(self.engine)
+
+    def test_statement_shape(self):
+        self.assertEqual(statement_shape('SELECT * FROM actor WHERE id IN (?, ?, ?)'), 'SELECT * FROM actor WHERE id IN (?)')
+        self.assertEqual(statement_shape('SELECT *\nFROM actor WHERE id = %(id_1)s'), 'SELECT * FROM actor WHERE id = ?')
+
+    def test_recording(self):
+        recorder, token = start_recording()
+        try:
+            with self.engine.connect() as connection:
+                for i in range(3):
+                    connection.execute(text('SELECT :i'), {'i': i})
+        finally:
+            stop_recording(token)
+        self.assertEqual(recorder.count, 3)
+        self.assertGreater(recorder.duration, 0)
+        self.assertEqual(recorder.slowest_statement, 'SELECT ?')
+        self.assertEqual(recorder.repeated(2), [('SELECT ?', 3)])
+        self.assertEqual(recorder.repeated(3), [])
+
+    def test_not_recording(self):
+        recorder = QueryRecorder()
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        self.assertEqual(recorder.count, 0)
+
+    def test_server_timing_and_strict_mode(self):
+        app = Flask(__name__)
+        instrument_requests(app)
+
+        @app.route('/queries/<int:n>')
+        def queries(n):
+            with self.engine.connect() as connection:
+                for i in range(n):
+                    connection.execute(text('SELECT :i'), {'i': i})
+            return 'ok'
+
+        res = app.test_client().get('/queries/2')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.headers.getlist('Server-Timing')[0].startswith('db;desc="2 queries";dur='))
+        saved = (utils.instrumentation.SQL_STRICT_MODE, utils.instrumentation.SQL_MAX_REPEATS)
+        try:
+            utils.instrumentation.SQL_STRICT_MODE, utils.instrumentation.SQL_MAX_REPEATS = 'raise', 2
+            self.assertEqual(app.test_client().get('/queries/2').status_code, 200)
+            self.assertEqual(app.test_client().get('/queries/3').status_code, 500)
+        finally:
+            utils.instrumentation.SQL_STRICT_MODE, utils.instrumentation.SQL_MAX_REPEATS = saved
+
+    def test_failed_statements(self):
+        table = Table('dated', MetaData(), Column('day', Date))
+        table.create(self.engine)
+        with self.engine.connect() as connection:
+            # fails on its parameters (before its execution), then during its execution
+            with self.assertRaises(Exception):
+                connection.execute(insert(table), {'day': 'not a date'})
+            with self.assertRaises(Exception):
+                connection.execute(text('SELECT * FROM missing'))
+            self.assertEqual(connection.info['query_start_time'], [])
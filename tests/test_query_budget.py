@@ -0,0 +1,168 @@
+import datetime
+import re
+import sqlite3
+from sqlalchemy import delete, insert
+from sqlalchemy.pool import StaticPool
+
+import model
+from model import Actor, Movie, ActorMovieAssociation, projections
+from model.projections import rebuild_projections
+from tests.helpers import AppTestCase, keep_settings
+
+# page size of the list and search requests, and cast size of the seeded movies
+# (each seeded actor plays in CAST movies)
+PAGE = 20
+CAST = 3
+
+# collection sizes: the number of statements must be the same for both, and the rows fetched within the same budget
+SIZES = (30, 300)
+
+# requests, with their maximum number of SQL statements and of rows fetched
+# (single-row creations and updates are left out: SQLite rejects the date strings they pass to the database)
+BUDGETS = [
+    # (method, path, test client arguments, statements, rows)
+    # the associations of all the listed actors or movies are read by one additional query
+    ('GET', f'/api/v1/actors?limit={PAGE}', {}, 2, (PAGE + 1) * (1 + CAST)),
+    ('GET', f'/api/v1/actors?limit={PAGE}&fields=id,name', {}, 1, PAGE + 1),
+    ('GET', f'/api/v1/actors?limit={PAGE}&fields=id,name&include=associations', {}, 2, (PAGE + 1) * (1 + CAST)),
+    ('GET', f'/api/v1/actors?limit={PAGE}&gender=Female&sort=-birth_date', {}, 2, (PAGE + 1) * (1 + CAST)),
+    ('GET', '/api/v1/actors/2', {}, 2, 1 + CAST),
+    ('GET', '/api/v1/actors?ids=' + ','.join(str(i) for i in range(1, 11)), {}, 2, 10 * (1 + CAST)),
+    ('GET', f'/api/v1/actors/search?q=Actor+1&limit={PAGE}', {}, 1, PAGE),
+    ('GET', f'/api/v1/actors/search?q=act&typeahead=true&limit={PAGE}', {}, 1, PAGE),
+    ('GET', f'/api/v1/movies?limit={PAGE}', {}, 2, (PAGE + 1) * (1 + CAST)),
+    ('GET', f'/api/v1/movies?limit={PAGE}&genre=Drama&sort=release_date', {}, 2, (PAGE + 1) * (1 + CAST)),
+    ('GET', '/api/v1/movies/2', {}, 2, 1 + CAST),
+    ('GET', '/api/v1/movies?ids=' + ','.join(str(i) for i in range(1, 11)), {}, 2, 10 * (1 + CAST)),
+    ('GET', f'/api/v1/movies/search?q=Movie&limit={PAGE}', {}, 1, PAGE),
+    ('GET', f'/api/v1/movies/search?q=mov&typeahead=true&limit={PAGE}', {}, 1, PAGE),
+    # the writes also lock and refresh the filmographies and casts they change (each holding at most CAST + 1 items here)
+    ('DELETE', '/api/v1/actors/{unused_actor}', {}, 5, 1),
+    ('DELETE', '/api/v1/movies/{unused_movie}', {}, 5, 1),
+    ('PUT', '/api/v1/movies/1/cast', {'json': {'cast': [{'actor_id': 1, 'character_name': 'Lead'}, {'actor_id': 2, 'character_name': 'Villain'}]}}, 13, (CAST + 3) * (CAST + 1)),
+    ('POST', '/api/v1/actors/bulk', {'json': {'actors': [{'name': f'Bulk Actor {i}', 'gender': 'Male', 'birth_date': '1990-01-01', 'nationality': 'Brazilian'} for i in range(5)]}}, 2, 5),
+    ('POST', '/api/v1/movies/bulk', {'json': {'movies': [{'title': f'Bulk Movie {i}', 'genre': 'Drama', 'release_date': '1990-01-01'} for i in range(5)]}}, 2, 5),
+    ('POST', '/api/v1/actor-movie', {'data': {'actor_id': '{unused_actor}', 'movie_id': 1, 'character_name': 'Extra'}}, 8, 2 * (CAST + 1)),
+    ('DELETE', '/api/v1/actor-movie', {'data': {'actor_id': 1, 'movie_id': 1}}, 8, 2 * (CAST + 1)),
+    ('POST', '/api/v1/actor-movie/bulk', {'json': {'associations': [{'actor_id': '{unused_actor}', 'movie_id': i + 1, 'character_name': 'Extra'} for i in range(5)]}}, 10, 6 + 5 + 5 * (CAST + 1)),
+]
+
+# reads returning the denormalized filmographies and casts instead of joining the associations (DENORMALIZED_READS=1)
+DENORMALIZED_BUDGETS = [
+    ('GET', f'/api/v1/actors?limit={PAGE}', {}, 1, PAGE + 1),
+    ('GET', f'/api/v1/actors?limit={PAGE}&fields=id,name&include=associations', {}, 1, PAGE + 1),
+    ('GET', f'/api/v1/actors?limit={PAGE}&gender=Female&sort=-birth_date', {}, 1, PAGE + 1),
+    ('GET', '/api/v1/actors/2', {}, 1, 1),
+    ('GET', '/api/v1/actors?ids=' + ','.join(str(i) for i in range(1, 11)), {}, 1, 10),
+    ('GET', f'/api/v1/movies?limit={PAGE}', {}, 1, PAGE + 1),
+    ('GET', f'/api/v1/movies?limit={PAGE}&genre=Drama&sort=release_date', {}, 1, PAGE + 1),
+    ('GET', '/api/v1/movies/2', {}, 1, 1),
+    ('GET', '/api/v1/movies?ids=' + ','.join(str(i) for i in range(1, 11)), {}, 1, 10),
+]
+
+#
+# Helpers
+#
+class CountingCursor(sqlite3.Cursor):
+    """ Cursor counting the rows fetched through it.
+    """
+    rows = 0
+
+    def fetchone(self):
+        row = super().fetchone()
+        CountingCursor.rows += row is not None
+        return row
+
+    def fetchmany(self, *args):
+        rows = super().fetchmany(*args)
+        CountingCursor.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        CountingCursor.rows += len(rows)
+        return rows
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+def connect():
+    return sqlite3.connect(':memory:', factory=CountingConnection, check_same_thread=False)
+
+def seed(database, n):
+    """ Replaces the data by n actors and n movies, each movie having CAST actors and each actor
+    playing in CAST movies, along with an actor and a movie without any association (id n + 1).
+    """
+    session = database.session()
+    for table in (ActorMovieAssociation, Actor, Movie):
+        session.execute(delete(table))
+    session.execute(insert(Actor), [{"id": i + 1, "name": f'Actor {i + 1}', "gender": ('Female', 'Male')[i % 2],
+                                     "birth_date": datetime.date(1950 + i % 50, 1, 1), "nationality": ('Brazilian', 'French', 'Japanese')[i % 3]} for i in range(n + 1)])
+    session.execute(insert(Movie), [{"id": i + 1, "title": f'Movie {i + 1}', "genre": ('Drama', 'Comedy')[i % 2],
+                                     "release_date": datetime.date(1980 + i % 40, 1, 1)} for i in range(n + 1)])
+    session.execute(insert(ActorMovieAssociation), [{"actor_id": (m * CAST + k) % n + 1, "movie_id": m + 1, "character_name": f'Character {k + 1}'}
+                                                    for m in range(n) for k in range(CAST)])
+    session.commit()
+    rebuild_projections(session)
+    session.close()
+
+def fill(value, n):
+    """ Substitutes the ids of the actor and movie without associations into a path or request arguments.
+    """
+    if isinstance(value, str):
+        value = value.replace('{unused_actor}', str(n + 1)).replace('{unused_movie}', str(n + 1))
+        return int(value) if value.isdigit() else value
+    if isinstance(value, dict):
+        return {k: fill(v, n) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v, n) for v in value]
+    return value
+
+#
+# Test Class
+#
+class QueryBudgetTests(AppTestCase):
+    """ Each endpoint must run a bounded number of SQL statements, and fetch a bounded number
+    of rows, whatever the number of rows in the database (e.g. no lazy load per item).
+    """
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        self.app = self.create_app({"DATABASE_URL": 'sqlite://'})
+        # a single in-memory database, whose cursors count the rows they fetch
+        self.database = model.configure(self.app, 'sqlite://', creator=connect, poolclass=StaticPool)
+        self.addCleanup(self.database.dispose)
+        model.Base.metadata.create_all(self.database.engine)
+
+    def measure(self, n, method, path, arguments):
+        """ Returns the status, number of statements and number of rows fetched of a request on n seeded actors and movies.
+        """
+        seed(self.database, n)
+        CountingCursor.rows = 0
+        res = self.app.test_client().open(fill(path, n), method=method, **fill(arguments, n))
+        statements = int(re.match(r'db;desc="(\d+) queries"', res.headers.getlist('Server-Timing')[0]).group(1))
+        return res.status_code, statements, CountingCursor.rows
+
+    def check_budgets(self, budgets):
+        for method, path, arguments, max_statements, max_rows in budgets:
+            with self.subTest(f'{method} {path}'):
+                statements = []
+                for n in SIZES:
+                    status, count, rows = self.measure(n, method, path, arguments)
+                    self.assertEqual(status, 200)
+                    self.assertLessEqual(count, max_statements, f'{count} statements with {n} rows')
+                    self.assertLessEqual(rows, max_rows, f'{rows} rows fetched with {n} rows')
+                    statements.append(count)
+                self.assertEqual(len(set(statements)), 1, f'statements grow with the number of rows: {statements}')
+
+    def test_query_budgets(self):
+        keep_settings(self, projections, 'DENORMALIZED_READS')
+        projections.DENORMALIZED_READS = False
+        self.check_budgets(BUDGETS)
+
+    def test_denormalized_query_budgets(self):
+        keep_settings(self, projections, 'DENORMALIZED_READS')
+        projections.DENORMALIZED_READS = True
+        self.check_budgets(DENORMALIZED_BUDGETS)
@@ -0,0 +1,84 @@
+from sqlalchemy import create_engine
+
+import utils.cache
+from model.replicas import Replica, ReplicaSet
+from tests.helpers import AppTestCase, PostgresTestCase, actor, create_database
+
+#
+# Test Class
+#
+class ReplicaTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        self.primary_url = self.database_url
+        self.replica_url = self.sqlite_url('replica.db')
+        # the databases hold different actors, telling which one served a request
+        create_database(self.primary_url, actors=[actor('Primary Actor')])
+        create_database(self.replica_url, actors=[actor('Replica Actor')])
+
+    def client(self, replica_url):
+        return self.create_app({"DATABASE_REPLICA_URLS": [replica_url]}).test_client()
+
+    def actor_names(self, client):
+        res = client.get('/api/v1/actors?fields=name')
+        self.assertEqual(res.status_code, 200)
+        return [actor['name'] for actor in res.get_json()['actors']]
+
+    def test_reads_go_to_replica(self):
+        client = self.client(self.replica_url)
+        self.assertEqual(self.actor_names(client), ['Replica Actor'])
+        res = client.get('/api/v1/actors/search?q=actor')
+        self.assertEqual([actor['name'] for actor in res.get_json()['actors']], ['Replica Actor'])
+
+    def test_writes_go_to_primary(self):
+        client = self.client(self.replica_url)
+        res = client.post('/api/v1/actors/bulk', json={'actors': [{'name': 'New Actor', 'gender': 'Male', 'birth_date': '1990-01-01', 'nationality': 'French'}]})
+        self.assertEqual(res.get_json()['created'], 1)
+        # reads that follow a write go to the primary for a while
+        self.assertEqual(self.actor_names(client), ['Primary Actor', 'New Actor'])
+
+    def test_other_clients_read_from_replica(self):
+        client = self.client(self.replica_url)
+        actor = {'name': 'New Actor', 'gender': 'Male', 'birth_date': '1990-01-01', 'nationality': 'French'}
+        client.post('/api/v1/actors/bulk', json={'actors': [actor]}, headers={'Authorization': 'Bearer writer'})
+        self.assertIn('New Actor', [a['name'] for a in client.get('/api/v1/actors', headers={'Authorization': 'Bearer writer'}).get_json()['actors']])
+        # the replica has not replayed the write: its response is neither tagged nor cached
+        utils.cache.RESPONSE_CACHE_ENABLED = True
+        for _ in range(2):
+            res = client.get('/api/v1/actors', headers={'Authorization': 'Bearer reader'})
+            self.assertEqual([a['name'] for a in res.get_json()['actors']], ['Replica Actor'])
+            self.assertNotIn('ETag', res.headers)
+            self.assertNotIn('X-Cache', res.headers)
+            self.assertTrue(res.cache_control.no_store)
+
+    def test_unavailable_replica(self):
+        unavailable_url = self.sqlite_url('missing/replica.db')
+        client = self.client(unavailable_url)
+        # the request reading from the replica fails, and the replica is taken out of rotation
+        self.assertEqual(client.get('/api/v1/actors?fields=name').status_code, 500)
+        self.assertFalse(client.application.extensions['database'].pool_status()['replicas'][0]['healthy'])
+        self.assertEqual(self.actor_names(client), ['Primary Actor'])
+
+    def test_health_checks(self):
+        replicas = ReplicaSet([self.replica_url, 'sqlite:////nonexistent/replica.db'], create_engine, check_interval=3600)
+        self.assertEqual(replicas.check(), 1)
+        self.assertEqual([replica['healthy'] for replica in replicas.status()], [True, False])
+        # only the healthy replica is chosen
+        self.assertEqual({str(replicas.choose().url) for _ in range(3)}, {self.replica_url})
+        # after a write, the reads of its client go to the primary, and those of the other clients may be stale
+        replicas.record_write('client-1')
+        self.assertIsNone(replicas.choose('client-1'))
+        self.assertIsNotNone(replicas.choose('client-2'))
+        self.assertEqual((replicas.may_be_stale('client-1'), replicas.may_be_stale('client-2')), (False, True))
+        replicas.dispose()
+
+class PostgresReplicaTests(PostgresTestCase):
+
+    def test_lag(self):
+        # a server which is not a standby has no replication lag
+        replica = Replica(self.database_url, create_engine)
+        self.assertTrue(replica.check(max_lag=0))
+        self.assertIsNone(replica.lag)
+        replica.dispose()
@@ -0,0 +1,54 @@
+from sqlalchemy import event
+
+from tests.helpers import AppTestCase, actor, create_database, movie
+
+#
+# Test Class
+#
+class RepresentationTests(AppTestCase):
+    """ The associations of the represented actors and movies are loaded along with them, by a
+    fixed number of queries whatever the number of rows (not one query per actor, movie or association).
+    """
+
+    def create_client(self, n):
+        """ Returns a test client on a database of n actors and n movies, each movie casting all the actors.
+        """
+        self.database_url = self.sqlite_url(f'representations_{n}.db')
+        create_database(self.database_url, actors=[actor(f'Actor {i}') for i in range(1, n + 1)], movies=[movie(f'Movie {i}') for i in range(1, n + 1)],
+                        associations=[{"actor_id": a, "movie_id": m, "character_name": f'Character {a}'} for m in range(1, n + 1) for a in range(1, n + 1)])
+        self.app = self.create_app()
+        return self.app.test_client()
+
+    def get(self, client, path):
+        """ Returns the body of a GET request, and the number of statements it ran.
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = self.app.extensions['database'].engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            res = client.get(path)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(res.status_code, 200)
+        return res.get_json(), len(statements)
+
+    def test_fixed_number_of_queries(self):
+        paths = ['/api/v1/actors', '/api/v1/movies', '/api/v1/actors/1', '/api/v1/movies/1']
+        counts = {}
+        for n in (2, 20):
+            client = self.create_client(n)
+            for path in paths:
+                with self.subTest(path=path, n=n):
+                    data, counts[path, n] = self.get(client, path)
+                    items = data['actors'] if 'actors' in data else data['movies'] if 'movies' in data else [data]
+                    # every association, with the title or name of the other side
+                    for item in items:
+                        self.assertEqual(len(item['assocations']), n)
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertEqual(counts[path, 2], counts[path, 20])
+                self.assertLessEqual(counts[path, 20], 2)
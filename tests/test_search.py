@@ -0,0 +1,48 @@
+from sqlalchemy import create_engine, text
+
+from tests.helpers import PostgresTestCase, actor, create_database, movie
+
+NAMES = ['Arnold Schwarzenegger', 'Arnold Palmer', 'Scarlett Johansson', 'Stanley Kubrick', 'Catherine Zeta-Jones', 'Clint Eastwood']
+
+#
+# Test Class
+#
+class SearchTests(PostgresTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        # the searched names, among many others
+        create_database(self.database_url, actors=[actor(name) for name in NAMES] + [actor(f'Extra {i} Performer') for i in range(5000)],
+                        movies=[movie('The Godfather'), movie('The Godfather Part II'), movie('Goodfellas')])
+        engine = create_engine(self.database_url)
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+        engine.dispose()
+        self.client = self.create_app().test_client()
+
+    def names(self, path):
+        res = self.client.get(path)
+        self.assertEqual(res.status_code, 200)
+        data = res.get_json()
+        return [item.get('name', item.get('title')) for item in data.get('actors', data.get('movies'))]
+
+    def test_partial_and_misspelled_words(self):
+        cases = [('Schwarz', 'Arnold Schwarzenegger'), ('schwarzeneger', 'Arnold Schwarzenegger'), ('Kubrik', 'Stanley Kubrick'),
+                 ('Johans', 'Scarlett Johansson'), ('zeta', 'Catherine Zeta-Jones'), ('eastwo', 'Clint Eastwood')]
+        for q, name in cases:
+            with self.subTest(q=q):
+                self.assertEqual(self.names(f'/api/v1/actors/search?q={q}')[:1], [name])
+
+    def test_full_matches_first(self):
+        self.assertEqual(sorted(self.names('/api/v1/actors/search?q=Arnold')[:2]), ['Arnold Palmer', 'Arnold Schwarzenegger'])
+        self.assertEqual(self.names('/api/v1/movies/search?q=godfather')[:2], ['The Godfather', 'The Godfather Part II'])
+
+    def test_trigram_index(self):
+        engine = create_engine(self.database_url)
+        with engine.connect() as connection:
+            # (the planner would rather scan a table this small)
+            connection.execute(text('SET enable_seqscan = off'))
+            plan = connection.execute(text("EXPLAIN SELECT id FROM actor WHERE 'Schwarz' <% name OR name ILIKE '%Schwarz%'")).scalars().all()
+        engine.dispose()
+        self.assertIn('ix_actor_name_trgm', '\n'.join(plan))
@@ -0,0 +1,81 @@
+import datetime
+import decimal
+import unittest
+import uuid
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from tests.helpers import AppTestCase, actor, create_database, movie
+from utils.serialization import FastJSONProvider, json_provider_class
+
+# values whose encodings differ between orjson and the standard library, unless handled by the provider
+VALUES = [
+    {"id": 1, "name": 'Actor', "birth_date": datetime.date(1980, 1, 31), "assocations": [[1, 'Movie', 'Lead']]},
+    {"created_at": datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc), "price": decimal.Decimal('1.50'), "uuid": uuid.UUID(int=1)},
+    {"name": 'Zoë Saldaña', "title": 'Amélie', "symbol": '\u2116'},
+    ['\U0001f3ac Zoë', 'é\x7f'],
+    {"name": "Zoë Saldaña", "emoji": '\U0001f3ac', "control": '\x00\x1f\x7f', "separator": ' ', "quote": '"\\/'},
+    [0.0, -0.0, 0.1, 1 / 3, 1e-4, 1e-5, 2.5e-5, 1e-7, 1e15, 1e16, 1.5e22, -3e-9],
+    1e-05,
+    {"big": 2 ** 64, "small": -2 ** 63},
+    {1: 'integer key', 2: None},
+    {"b": 1, "a": {"d": None, "c": True}},
+    ['Se7en', 'x,1e5', '', []],
+]
+
+#
+# Test Class
+#
+class FastJSONProviderTests(unittest.TestCase):
+
+    # runs once before all test methods
+    @classmethod
+    def setUpClass(self):
+        self.app = Flask(__name__)
+        self.stdlib = DefaultJSONProvider(self.app)
+        self.fast = FastJSONProvider(self.app)
+
+    def assertSameEncoding(self, value):
+        self.assertEqual(self.fast.dumps(value, separators=(',', ':')), self.stdlib.dumps(value, separators=(',', ':')))
+        self.assertEqual(self.fast.dumps(value), self.stdlib.dumps(value))
+        with self.app.app_context():
+            self.assertEqual(self.fast.response(value).get_data(), self.stdlib.response(value).get_data())
+
+    def test_same_encoding(self):
+        for sort_keys in (True, False):
+            for ensure_ascii in (True, False):
+                self.stdlib.sort_keys = self.fast.sort_keys = sort_keys
+                self.stdlib.ensure_ascii = self.fast.ensure_ascii = ensure_ascii
+                for value in VALUES:
+                    with self.subTest(value=value, sort_keys=sort_keys, ensure_ascii=ensure_ascii):
+                        self.assertSameEncoding(value)
+
+    def test_fallbacks(self):
+        # payloads orjson cannot reproduce are left to the standard library
+        self.assertIsNotNone(self.fast.encode({"rank": 0.5, "birth_date": datetime.date(1980, 1, 1)}))
+        self.assertIsNone(self.fast.encode({"rank": 1e-05}))
+        self.assertIsNone(self.fast.encode({"big": 2 ** 64}))
+        self.assertIsNone(self.fast.encode({1: 'integer key'}))
+
+    def test_provider_names(self):
+        self.assertIs(json_provider_class('stdlib'), DefaultJSONProvider)
+        self.assertIs(json_provider_class('orjson'), FastJSONProvider)
+        self.assertIs(json_provider_class('auto'), FastJSONProvider)
+        with self.assertRaises(ValueError):
+            json_provider_class('simplejson')
+
+class ResponseEncodingTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        create_database(self.database_url, actors=[actor(f'Actör {i}', birth_date=datetime.date(1950 + i, 1, 1)) for i in range(30)],
+                        movies=[movie(f'Movie {i}', release_date=datetime.date(1990, 1, 1 + i % 28)) for i in range(30)])
+
+    def test_same_responses(self):
+        paths = ['/api/v1/actors?limit=10', '/api/v1/movies?stream=true', '/api/v1/actors/3', '/api/v1/actors/search?q=act&typeahead=true', '/api/v1/movies/search?q=movie']
+        bodies = {}
+        for provider in ('stdlib', 'orjson'):
+            client = self.create_app({"JSON_PROVIDER": provider}).test_client()
+            bodies[provider] = [client.get(path).get_data() for path in paths]
+        self.assertEqual(bodies['orjson'], bodies['stdlib'])
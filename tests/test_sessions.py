@@ -0,0 +1,103 @@
+import os
+from unittest import mock
+from sqlalchemy import create_engine, insert, text
+
+import model.bulk
+from model import Actor, Session
+from model.pool import InstrumentedQueuePool, pool_options
+from tests.helpers import AppTestCase, count, create_database
+
+#
+# Test Class
+#
+class SessionTests(AppTestCase):
+
+    # runs before each test
+    def setUp(self):
+        super().setUp()
+        create_database(self.database_url)
+        engine = create_engine(self.database_url)
+        with engine.begin() as connection:
+            # makes the INSERT of a given actor fail
+            connection.execute(text("CREATE TRIGGER fail_insert BEFORE INSERT ON actor WHEN NEW.name = 'Failing' BEGIN SELECT RAISE(ABORT, 'failing insert'); END"))
+        engine.dispose()
+        self.app = self.create_app()
+        self.client = self.app.test_client()
+
+    def test_one_session_per_request(self):
+        sessions = []
+
+        @self.app.get('/sessions')
+        def sessions_route():
+            # the handler and the functions it calls share the session of the request
+            sessions.append((Session(), Session()))
+            Session().execute(insert(Actor).values(name='Uncommitted'))
+            return 'ok'
+
+        for _ in range(2):
+            self.assertEqual(self.client.get('/sessions').status_code, 200)
+            # removed (and its uncommitted changes rolled back) once the request is done
+            self.assertFalse(Session.registry.has())
+            self.assertEqual(self.app.extensions['database'].engine.pool.checkedout(), 0)
+        (first, same), (second, _) = sessions
+        self.assertIs(first, same)
+        self.assertIsNot(first, second)
+        self.assertEqual(count(self.app, Actor), 0)
+
+    def test_session_removed_after_failed_request(self):
+        @self.app.get('/failing')
+        def failing_route():
+            Session().execute(insert(Actor).values(name='Uncommitted'))
+            raise RuntimeError('failure')
+
+        self.app.testing = False
+        self.assertEqual(self.client.get('/failing').status_code, 500)
+        self.assertFalse(Session.registry.has())
+        self.assertEqual(self.app.extensions['database'].engine.pool.checkedout(), 0)
+        self.assertEqual(count(self.app, Actor), 0)
+
+    def test_failed_request_rolled_back(self):
+        actors = [{"name": name, "gender": 'Female', "birth_date": '1980-01-01', "nationality": 'Brazilian'} for name in ('Actor 1', 'Failing')]
+        # one INSERT statement per actor: the first one succeeds, the second one fails
+        with mock.patch.object(model.bulk, 'INSERT_BATCH_SIZE', 1):
+            res = self.client.post('/api/v1/actors/bulk', json={"actors": actors})
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(count(self.app, Actor), 0)
+        res = self.client.post('/api/v1/actors/bulk', json={"actors": actors[:1]})
+        self.assertEqual(res.get_json()['created'], 1)
+        self.assertEqual(count(self.app, Actor), 1)
+
+    def test_error_after_flush_rolled_back(self):
+        self.client.post('/api/v1/actors/bulk', json={"actors": [{"name": 'Actor 1', "gender": 'Female', "birth_date": '1980-01-01', "nationality": 'Brazilian'}]})
+        # a failure after the changes were flushed (e.g. while refreshing the projections)
+        with mock.patch('app.refresh_projections', side_effect=RuntimeError('failure')):
+            res = self.client.delete('/api/v1/actors/1')
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(count(self.app, Actor), 1)
+
+    def test_apps_keep_their_own_database(self):
+        other_url = self.sqlite_url('other.db')
+        create_database(other_url)
+        other = self.create_app({"DATABASE_URL": other_url})
+        actors = [{"name": name, "gender": 'Female', "birth_date": '1980-01-01', "nationality": 'Brazilian'} for name in ('Actor 1', 'Actor 2')]
+        other.test_client().post('/api/v1/actors/bulk', json={"actors": actors})
+        self.client.post('/api/v1/actors/bulk', json={"actors": actors[:1]})
+        self.assertEqual((count(self.app, Actor), count(other, Actor)), (1, 2))
+
+class PoolOptionTests(AppTestCase):
+
+    def test_pool_options(self):
+        environment = {"DB_POOL_SIZE": '3', "DB_MAX_OVERFLOW": '2', "DB_POOL_TIMEOUT": '1.5', "DB_POOL_RECYCLE": '600', "DB_POOL_PRE_PING": '1'}
+        with mock.patch.dict(os.environ, environment):
+            options = pool_options('postgresql://localhost/fsnd_capstone')
+            sqlite_options = pool_options(self.database_url)
+        self.assertEqual(options, {"poolclass": InstrumentedQueuePool, "pool_size": 3, "max_overflow": 2, "pool_timeout": 1.5, "pool_recycle": 600, "pool_pre_ping": True})
+        # SQLite databases do not use a queue pool
+        self.assertEqual(sqlite_options, {"pool_recycle": 600, "pool_pre_ping": True})
+
+    def test_engine_pool(self):
+        with mock.patch.dict(os.environ, {"DB_POOL_SIZE": '3', "DB_MAX_OVERFLOW": '2'}):
+            engine = model.Database('postgresql://localhost/fsnd_capstone').engine
+        self.addCleanup(engine.dispose)
+        self.assertIsInstance(engine.pool, InstrumentedQueuePool)
+        self.assertEqual((engine.pool.size(), engine.pool._max_overflow), (3, 2))
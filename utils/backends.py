@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+#
+# In-memory backend
+#
+class MemoryBackend:
+    """ Process-local storage of the collection version counters and of the cached responses.
+
+    Each process starts a new 'epoch', so that versions (and the ETags derived
+    from them) never repeat across restarts, nor match between processes.
+    Cached responses are evicted in least recently used order.
+    """
+
+    # the versions and responses are not seen by the other processes
+    shared = False
+
+    def __init__(self, max_entries=256):
+        self.epoch = uuid.uuid4().hex
+        self.max_entries = max_entries
+        self._versions = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def versions(self, names):
+        """ Returns the current version of each collection.
+        """
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in names)
+
+    def bump(self, names):
+        """ Increments the version of each collection.
+        """
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+            # responses depending on the bumped collections can no longer be served
+            for key in [key for key, entry in self._entries.items() if entry[2] & set(names)]:
+                del self._entries[key]
+
+    def get(self, key):
+        """ Returns a cached (content type, content encoding, body) triple, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags, ttl):
+        """ Caches a (content type, content encoding, body) triple, depending on the given collections, for ttl seconds.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl, set(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+#
+# SQLite backend
+#
+class SQLiteBackend:
+    """ Storage of the collection version counters and of the cached responses in a local SQLite file.
+
+    All the processes (e.g. gunicorn workers) pointing to the same file share
+    the counters, the epoch and the cached responses.
+    """
+
+    shared = True
+
+    def __init__(self, path, max_entries=256, timeout=5):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._local = threading.local()
+        connection = self._connection()
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            # entries cached by earlier versions (without their content encoding) are dropped
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(entries)')]
+            if columns and 'content_encoding' not in columns:
+                connection.execute('DROP TABLE entries')
+            connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, content_type TEXT, content_encoding TEXT, body BLOB, tags TEXT, expires_at REAL, accessed_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at)')
+            connection.execute('INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)', ('epoch', uuid.uuid4().hex))
+        self.epoch = connection.execute("SELECT value FROM settings WHERE name = 'epoch'").fetchone()[0]
+
+    def _connection(self):
+        """ Returns the connection of the current thread (sqlite3 connections can not be shared between threads).
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def versions(self, names):
+        """ Returns the current version of each collection.
+        """
+        placeholders = ','.join('?' * len(names))
+        rows = self._connection().execute(f'SELECT name, version FROM versions WHERE name IN ({placeholders})', tuple(names)).fetchall()
+        versions = dict(rows)
+        return tuple(versions.get(name, 0) for name in names)
+
+    def bump(self, names):
+        """ Increments the version of each collection.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for name in names:
+                connection.execute('INSERT INTO versions (name, version) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET version = version + 1', (name,))
+                # responses depending on the bumped collection can no longer be served
+                connection.execute("DELETE FROM entries WHERE ' ' || tags || ' ' LIKE ?", (f'% {name} %',))
+
+    def get(self, key):
+        """ Returns a cached (content type, content encoding, body) triple, or None.
+        """
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute('SELECT content_type, content_encoding, body FROM entries WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return row[0], row[1], bytes(row[2])
+
+    def set(self, key, value, tags, ttl):
+        """ Caches a (content type, content encoding, body) triple, depending on the given collections, for ttl seconds.
+        """
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('INSERT OR REPLACE INTO entries (key, content_type, content_encoding, body, tags, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)', (key, value[0], value[1], value[2], ' '.join(tags), now + ttl, now))
+            connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+            connection.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+#
+# Backend factory
+#
+def create_backend(url, max_entries=256):
+    """ Creates a backend from its URL: 'memory://' or 'sqlite:///<path>'.
+
+    Any object implementing the same methods (epoch, versions, bump, get, set, size)
+    can be used instead, by assigning it to utils.backends.backend (along with a 'shared'
+    attribute, telling whether it is shared by the processes, which enables the response cache).
+    """
+    if url in (None, '', 'memory://'):
+        return MemoryBackend(max_entries)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):], max_entries)
+    raise ValueError(f'unsupported cache backend: {url}')
+
+# backend shared by the ETag and cache layers
+backend = create_backend(os.environ.get('CACHE_BACKEND_URL', 'memory://'), int(os.environ.get('RESPONSE_CACHE_SIZE', 256)))
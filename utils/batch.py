@@ -0,0 +1,77 @@
+import contextvars
+from flask import current_app, g, request
+from werkzeug.test import EnvironBuilder
+
+from model import Session, transaction
+from schemas.error import ErrorRepresentation
+from utils.etag import bump
+
+#
+# Batch operations
+#
+def run_operation(operation):
+    """ Runs an operation through the application's handler of its method and path
+    (permission checks included), and returns the handler's response.
+    """
+    app = current_app._get_current_object()
+    arguments = {}
+    if operation.body is not None:
+        arguments['json'] = operation.body
+    if operation.form is not None:
+        arguments['data'] = {name: str(value) for name, value in operation.form.items() if value is not None}
+    environ = EnvironBuilder(path=operation.path, method=operation.method, base_url=request.host_url, **arguments).get_environ()
+
+    def dispatch():
+        # the operation's request context shares the batch's application context (i.e. g, holding
+        # the verified token), and is dropped along with this copy of the context variables instead
+        # of being popped: the teardown functions (session release, query logging) belong to the batch
+        app.request_context(environ).push()
+        try:
+            rv = app.dispatch_request()
+        except Exception as e:
+            # aborts and authorization errors go through the error handlers, anything else fails the batch
+            rv = app.handle_user_exception(e)
+        return app.make_response(rv)
+
+    return contextvars.copy_context().run(dispatch)
+
+def run_batch(operations, atomic=True):
+    """ Runs write operations in order, on one session and in a single transaction.
+
+    Arguments:
+        operations: the operations (method, path, and JSON body or form fields).
+        atomic: when True, the first failed operation rolls back the whole batch, and the
+            next ones are not run; otherwise only the failed operations are rolled back.
+
+    Returns the per-operation results (status and body), and whether the batch was committed.
+    """
+    results = []
+    failed = False
+    g.pending_invalidations = set()
+    try:
+        with transaction() as batch_transaction:
+            for index, operation in enumerate(operations):
+                if failed and atomic:
+                    results.append({"index": index, "status": 424, "body": ErrorRepresentation('Not run: a previous operation failed.')})
+                    continue
+                if operation.path.split('?')[0].rstrip('/') == request.path.rstrip('/'):
+                    response = current_app.make_response((ErrorRepresentation('Batches cannot be nested.'), 400))
+                else:
+                    response = run_operation(operation)
+                # each operation runs in its own savepoint
+                session = Session()
+                if response.status_code >= 400:
+                    failed = True
+                    session.rollback()
+                else:
+                    session.commit()
+                results.append({"index": index, "status": response.status_code, "body": response.get_json(silent=True)})
+            committed = not (failed and atomic)
+            if committed:
+                batch_transaction.commit()
+        # the versions of the modified collections are only bumped once their changes are visible
+        if committed and g.pending_invalidations:
+            bump(*g.pending_invalidations)
+    finally:
+        g.pop('pending_invalidations', None)
+    return results, committed
@@ -0,0 +1,87 @@
+import os
+import threading
+from functools import wraps
+from flask import current_app, g
+
+from model import reads_may_be_stale
+from utils import backends
+from utils.compression import compress_response
+from utils.etag import compute_etag
+
+# response cache settings (entries are evicted after RESPONSE_CACHE_TTL seconds, or once RESPONSE_CACHE_SIZE is reached).
+# Unless RESPONSE_CACHE_ENABLED is set (0 or 1), the cache is only enabled when its backend is shared by the processes:
+# the cache of a single process would keep serving the responses invalidated by the writes of the others
+RESPONSE_CACHE_ENABLED = {'0': False, '1': True}.get(os.environ.get('RESPONSE_CACHE_ENABLED'))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+#
+# Cache statistics
+#
+class CacheStatistics:
+    """ Hit/miss counters of the response cache (per process).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': backends.backend.size()}
+
+cache_statistics = CacheStatistics()
+
+def cache_enabled():
+    """ Returns whether the responses are cached (see RESPONSE_CACHE_ENABLED).
+    """
+    if RESPONSE_CACHE_ENABLED is None:
+        return getattr(backends.backend, 'shared', False)
+    return RESPONSE_CACHE_ENABLED
+
+#
+# @cached() decorator method
+#
+def cached(*collections):
+    """ Caches the serialized responses of a read endpoint.
+
+    Responses are keyed by their ETag, which changes whenever one of the
+    collections they depend on is modified, so writes never let stale
+    responses through; the backend also drops them when the versions are bumped.
+    Responses are cached compressed (as negotiated with the client, which is part
+    of the ETag), so that hits are not compressed again.
+
+    Arguments:
+        collections: the collections the response depends on.
+    """
+    def cached_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not cache_enabled():
+                return f(*args, **kwargs)
+            key = g.get('etag') or compute_etag(collections)
+            value = backends.backend.get(key)
+            if value is not None:
+                cache_statistics.record(hit=True)
+                response = current_app.response_class(value[2], status=200, content_type=value[0])
+                if value[1]:
+                    response.headers['Content-Encoding'] = value[1]
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            cache_statistics.record(hit=False)
+            response = current_app.make_response(f(*args, **kwargs))
+            # (responses read from a replica which may miss a recent write are not cached)
+            if response.status_code == 200 and not response.is_streamed and not reads_may_be_stale():
+                compress_response(response)
+                backends.backend.set(key, (response.content_type, response.content_encoding, response.get_data()), collections, RESPONSE_CACHE_TTL)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return cached_decorator
@@ -0,0 +1,115 @@
+import gzip
+import os
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# response compression settings: bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as is, the others
+# are compressed with gzip (level 1-9) or brotli (quality 0-11), as negotiated with the client
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED') != '0'
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+
+# media types worth compressing (JSON documents and streams, documentation pages)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'application/javascript', 'text/html', 'text/css', 'text/plain'}
+
+#
+# Encoders
+#
+class GzipStream:
+    """ Incremental gzip compressor, flushing each chunk so that streamed rows are not held back.
+    """
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class BrotliStream:
+    """ Incremental brotli compressor, flushing each chunk so that streamed rows are not held back.
+    """
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+def gzip_compress(data):
+    # no modification time, so that the same body is always compressed into the same bytes
+    return gzip.compress(data, COMPRESSION_LEVEL, mtime=0)
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+# encodings offered to the clients, in order of preference (when the clients accept several equally)
+ENCODERS = {'br': (brotli_compress, BrotliStream), 'gzip': (gzip_compress, GzipStream)} if brotli is not None else {'gzip': (gzip_compress, GzipStream)}
+
+#
+# Content negotiation
+#
+def negotiate_encoding():
+    """ Returns the content encoding of the current request's response ('br', 'gzip'), or None if it is not compressed.
+    """
+    if not COMPRESSION_ENABLED:
+        return None
+    return request.accept_encodings.best_match(ENCODERS)
+
+def _compress_stream(chunks, stream):
+    """ Compresses a streamed body as it is sent.
+    """
+    try:
+        for chunk in chunks:
+            data = stream.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response):
+    """ Compresses the body of a response (in place) with the encoding negotiated with the client.
+
+    Streamed bodies are compressed chunk by chunk, whatever their size. Responses
+    already compressed (e.g. by the response cache) are left as they are.
+    """
+    if not COMPRESSION_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES or response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    compress, stream = ENCODERS[encoding]
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, stream())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compress(data))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def compress_responses(app):
+    """ Compresses the responses of an application, as negotiated with the clients (Accept-Encoding).
+    """
+
+    @app.after_request
+    def compress(response):
+        return compress_response(response)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+from functools import wraps
+from flask import current_app, g, request
+
+from model import reads_may_be_stale
+from utils import backends
+from utils.compression import negotiate_encoding
+
+# Cache-Control max-age of the read responses, in seconds: caches may serve them for this long,
+# then revalidate them with their ETag
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', 0))
+# lets shared caches (CDNs, proxies) store the responses even when authentication is enabled
+# (only for caches which authenticate the requests themselves)
+CACHE_PUBLIC = os.environ.get('CACHE_PUBLIC') == '1'
+
+#
+# Collections whose versions are tracked
+#
+ACTORS = 'actors'
+MOVIES = 'movies'
+ASSOCIATIONS = 'associations'
+
+#
+# Entity tags
+#
+def compute_etag(collections):
+    """ Returns the strong ETag of the current request's response.
+
+    The tag is derived from the versions of the collections the response depends
+    on, along with the request path, query string, Accept header and negotiated
+    content encoding (compressed responses are different representations).
+    """
+    versions = backends.backend.versions(collections)
+    query = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    key = f'{backends.backend.epoch}|{versions}|{request.path}?{query}|{request.headers.get("Accept", "")}|{negotiate_encoding() or ""}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def bump(*collections):
+    """ Invalidates the ETags (and cached responses) of the given collections.
+    """
+    backends.backend.bump(collections)
+
+#
+# @conditional() decorator method
+#
+def set_cache_headers(response):
+    """ Sets the Cache-Control and Vary headers of a read response.
+
+    Without authentication (or with CACHE_PUBLIC=1), shared caches may store the
+    response; otherwise only the client's own cache may.
+    """
+    if not current_app.config.get('ENABLE_AUTH', True) or CACHE_PUBLIC:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.vary.add('Accept')
+
+def conditional(*collections):
+    """ Adds an ETag and cache headers to the responses of a read endpoint, and answers
+    'If-None-Match' requests with 304 (Not Modified) without calling the endpoint.
+
+    Arguments:
+        collections: the collections the response depends on.
+    """
+    def conditional_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            etag = g.etag = compute_etag(collections)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                set_cache_headers(response)
+                return response
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                if reads_may_be_stale():
+                    # read from a replica which may miss a recent write: the response is not tagged with the new versions
+                    response.cache_control.no_store = True
+                else:
+                    response.set_etag(etag)
+                    set_cache_headers(response)
+            return response
+        return wrapper
+    return conditional_decorator
+
+#
+# @invalidates() decorator method
+#
+def invalidates(*collections):
+    """ Bumps the versions of the given collections once a write endpoint succeeds.
+
+    Arguments:
+        collections: the collections modified by the endpoint.
+    """
+    def invalidates_decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code < 400:
+                # within a batch, the versions are bumped once the batch is committed
+                pending = g.get('pending_invalidations')
+                if pending is not None:
+                    pending.update(collections)
+                else:
+                    bump(*collections)
+            return response
+        return wrapper
+    return invalidates_decorator
@@ -0,0 +1,79 @@
+import logging
+import os
+from flask import g, request
+
+from model.queries import start_recording, stop_recording
+
+# per-request SQL instrumentation (SQL_INSTRUMENTATION=0 disables it)
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION') != '0'
+
+# strict mode: 'warn' logs, and 'raise' fails, the requests running a statement shape more than SQL_MAX_REPEATS times
+SQL_STRICT_MODE = os.environ.get('SQL_STRICT_MODE', 'off')
+SQL_MAX_REPEATS = int(os.environ.get('SQL_MAX_REPEATS', 10))
+
+# length at which the logged statements are truncated
+LOGGED_STATEMENT_LENGTH = 200
+
+logger = logging.getLogger(__name__)
+
+#
+# Repeated query exception
+#
+class RepeatedQueryError(Exception):
+    def __init__(self, endpoint, shape, count):
+        super().__init__(f'{endpoint}: statement executed {count} times (more than {SQL_MAX_REPEATS}): {shape}')
+        self.endpoint = endpoint
+        self.shape = shape
+        self.count = count
+
+def _truncate(statement):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= LOGGED_STATEMENT_LENGTH else statement[:LOGGED_STATEMENT_LENGTH] + '...'
+
+def _check_repeats(recorder):
+    """ Flags the current endpoint if a statement shape ran more than SQL_MAX_REPEATS times (strict mode).
+    """
+    # (the error response of a failed request goes through the check again)
+    if SQL_STRICT_MODE not in ('warn', 'raise') or g.get('query_repeats_checked'):
+        return
+    g.query_repeats_checked = True
+    for shape, count in recorder.repeated(SQL_MAX_REPEATS):
+        if SQL_STRICT_MODE == 'raise':
+            raise RepeatedQueryError(request.endpoint, shape, count)
+        logger.warning(f'{request.method} {request.path} ({request.endpoint}): statement executed {count} times: {_truncate(shape)}')
+
+#
+# Request hooks
+#
+def instrument_requests(app):
+    """ Records the statements executed by each request of an application.
+
+    Adds a Server-Timing header to the responses (query count, total and slowest
+    query durations), and logs the same figures once the request is done (streamed
+    responses included).
+    """
+    if not SQL_INSTRUMENTATION:
+        return
+
+    @app.before_request
+    def start_query_recording():
+        g.query_recorder, g.query_recording_token = start_recording()
+
+    @app.after_request
+    def add_server_timing(response):
+        recorder = g.get('query_recorder')
+        if recorder is not None:
+            _check_repeats(recorder)
+            # streamed responses run most of their queries after the headers are sent
+            response.headers.add('Server-Timing', f'db;desc="{recorder.count} queries";dur={recorder.duration * 1000:.2f}')
+            response.headers.add('Server-Timing', f'db-slowest;dur={recorder.slowest_duration * 1000:.2f}')
+        return response
+
+    @app.teardown_request
+    def log_queries(exception=None):
+        recorder = g.pop('query_recorder', None)
+        if recorder is None:
+            return
+        stop_recording(g.pop('query_recording_token'))
+        slowest = f', slowest {recorder.slowest_duration * 1000:.2f}ms: {_truncate(recorder.slowest_statement)}' if recorder.slowest_statement else ''
+        logger.info(f'{request.method} {request.full_path.rstrip("?")}: {recorder.count} queries in {recorder.duration * 1000:.2f}ms{slowest}')
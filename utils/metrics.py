@@ -0,0 +1,91 @@
+import os
+import time
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# metrics of all the worker processes are aggregated through the files of this directory (e.g. under gunicorn)
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#
+# HTTP metrics (by method and route, i.e. URL rule)
+#
+http_requests = Counter('http_requests', 'HTTP requests.', ['method', 'route', 'status'])
+http_request_duration = Histogram('http_request_duration_seconds', 'Time to the response headers.', ['method', 'route'], buckets=LATENCY_BUCKETS)
+http_response_bytes = Counter('http_response_bytes', 'Bytes of the response bodies.', ['method', 'route'])
+
+#
+# Authentication metrics
+#
+jwt_verification_duration = Histogram('jwt_verification_duration_seconds', 'Time spent verifying (and decoding) tokens missing from the token cache.', buckets=LATENCY_BUCKETS)
+jwt_token_cache = Counter('jwt_token_cache_lookups', 'Lookups of the verified token cache.', ['result'])
+jwks_fetches = Counter('jwks_fetches', 'Fetches of the issuer public keys (JWKS).', ['result'])
+jwks_fetch_duration = Histogram('jwks_fetch_duration_seconds', 'Time spent fetching the issuer public keys (JWKS).', buckets=LATENCY_BUCKETS)
+
+#
+# Connection pool metrics
+#
+db_pool_checkouts = Counter('db_pool_checkouts', 'Connections checked out of the pool.')
+db_pool_checked_out = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool.', multiprocess_mode='livesum')
+db_pool_wait = Histogram('db_pool_wait_seconds', 'Time spent waiting for a connection from the pool.', buckets=LATENCY_BUCKETS)
+db_pool_timeouts = Counter('db_pool_timeouts', 'Checkouts that timed out waiting for a connection.')
+
+def record_jwks_fetch(ok, seconds):
+    """ Records a JWKS fetch (see JWKSKeyStore's on_fetch).
+    """
+    jwks_fetches.labels('ok' if ok else 'error').inc()
+    jwks_fetch_duration.observe(seconds)
+
+#
+# Metrics exposition
+#
+def render_metrics():
+    """ Returns the metrics of all the processes (or of the current one only, when not running
+    in multiprocess mode), in the Prometheus text format, along with their content type.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+#
+# Request hooks
+#
+def _count_bytes(iterable, labels):
+    """ Counts the bytes of a streamed body as they are sent.
+    """
+    try:
+        for chunk in iterable:
+            http_response_bytes.labels(*labels).inc(len(chunk.encode()) if isinstance(chunk, str) else len(chunk))
+            yield chunk
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+def instrument_app(app):
+    """ Records the count, latency and size of the responses of each route of an application.
+    """
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start_time = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start_time = g.pop('request_start_time', None)
+        if start_time is None:
+            return response
+        # the URL rule (e.g. /api/v1/actors/<int:id>) keeps the number of label values bounded
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (request.method, route)
+        http_requests.labels(*labels, str(response.status_code)).inc()
+        http_request_duration.labels(*labels).observe(time.perf_counter() - start_time)
+        if response.is_streamed:
+            response.response = _count_bytes(response.response, labels)
+        else:
+            http_response_bytes.labels(*labels).inc(response.calculate_content_length() or 0)
+        return response
@@ -0,0 +1,135 @@
+import codecs
+import datetime
+import re
+from functools import lru_cache
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# separators of the compact encoding, the only one orjson produces
+COMPACT_SEPARATORS = (',', ':')
+
+# floats that the standard library writes in exponent notation (below 1e-4, or from 1e16 on), and orjson
+# either in exponent notation without '+' nor leading zeros, or as decimals (e.g. 0.00001): the payloads
+# holding such numbers (or strings looking like them) are encoded by the standard library instead
+FLOAT_MISMATCH = re.compile(rb'(?:^|[:,\[])-?(?:[0-9]+(?:\.[0-9]+)?[eE]|0\.0000)')
+
+# maps the digits to 0, so that a single search finds the digits followed by an exponent
+ZERO_DIGITS = bytes.maketrans(b'123456789', b'000000000')
+
+# longest prefix of a float before its exponent ('-' and 17 significant digits, with the decimal point)
+FLOAT_PREFIX_LENGTH = 32
+
+#
+# Encoding helpers
+#
+@lru_cache(maxsize=4096)
+def _http_date(value):
+    return http_date(value)
+
+def _escape(character):
+    """ Returns the '\\uXXXX' escape of a character (a surrogate pair beyond the BMP), like json.dumps(ensure_ascii=True).
+    """
+    code = ord(character)
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+def _json_escape(error):
+    """ Encoding error handler escaping the non-ASCII characters, so that only those go through Python code.
+    """
+    return ''.join(map(_escape, error.object[error.start:error.end])), error.end
+
+codecs.register_error('json_escape', _json_escape)
+
+def _escape_non_ascii(data):
+    """ Returns the encoding data with its non-ASCII characters escaped, like json.dumps(ensure_ascii=True).
+    """
+    text = data.decode()
+    if b'\\' not in data:
+        # the only backslashes are then those written by 'backslashreplace' ('\\xXX', '\\uXXXX' or '\\UXXXXXXXX')
+        escaped = text.encode('ascii', 'backslashreplace')
+        if b'\\U' not in escaped:
+            return escaped.replace(b'\\x', b'\\u00')
+    return text.encode('ascii', 'json_escape')
+
+def _float_mismatch(data):
+    """ Returns whether the orjson encoding data holds floats the standard library would write differently.
+    """
+    # searching substrings is much faster than searching FLOAT_MISMATCH, only matched around them
+    for marker, haystack in ((b'0e', data.translate(ZERO_DIGITS)), (b'0.0000', data)):
+        index = haystack.find(marker)
+        while index != -1:
+            if FLOAT_MISMATCH.search(data, max(index - FLOAT_PREFIX_LENGTH, 0), index + len(marker)):
+                return True
+            index = haystack.find(marker, index + 1)
+    return False
+
+#
+# Fast JSON provider
+#
+class FastJSONProvider(DefaultJSONProvider):
+    """ JSON provider encoding with orjson, producing the same bytes as Flask's default provider.
+
+    Dates go through the same default hook (HTTP dates, cached), non-ASCII characters are
+    escaped when ensure_ascii is set, and the encodings orjson cannot reproduce (indented
+    output, floats in exponent notation, integers beyond 64 bits, non-string keys) fall back
+    to the standard library. NaN and infinite floats, which the standard library writes as
+    invalid JSON, are written as null.
+    """
+
+    def _default(self, value):
+        if type(value) is datetime.date:
+            return _http_date(value)
+        return self.default(value)
+
+    def encode(self, obj):
+        """ Returns the compact encoding of obj, or None when only the standard library can encode it identically.
+        """
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            data = orjson.dumps(obj, default=self._default, option=option)
+        except orjson.JSONEncodeError:
+            return None
+        if _float_mismatch(data):
+            return None
+        if self.ensure_ascii:
+            # DEL is ASCII, but escaped by the standard library too
+            if not data.isascii():
+                data = _escape_non_ascii(data)
+            data = data.replace(b'\x7f', b'\\u007f')
+        return data
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() <= {'separators'} and kwargs.get('separators') == COMPACT_SEPARATORS:
+            data = self.encode(obj)
+            if data is not None:
+                return data.decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # compact unless in debug mode (see DefaultJSONProvider.response)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        data = self.encode(self._prepare_response_obj(args, kwargs))
+        if data is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+def json_provider_class(name='auto'):
+    """ Returns the JSON provider class of the given name: 'orjson', 'stdlib', or 'auto' (orjson when it is installed).
+    """
+    if name == 'stdlib' or (name == 'auto' and orjson is None):
+        return DefaultJSONProvider
+    if name not in ('orjson', 'auto'):
+        raise ValueError(f'unknown JSON provider: {name}')
+    if orjson is None:
+        raise ImportError("the 'orjson' JSON provider requires the orjson package")
+    return FastJSONProvider
@@ -0,0 +1,49 @@
+import os
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# number of rows fetched from the database at a time, and size of the chunks written to the client
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+#
+# Newline-delimited JSON streaming
+#
+def wants_stream(stream=None):
+    """ Returns True if the client asked for a streamed (NDJSON) response.
+
+    Arguments:
+        stream: value of the 'stream' query parameter.
+    """
+    if stream:
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def NDJSONResponse(query, representation):
+    """ Returns a response streaming the rows of a query as newline-delimited JSON.
+
+    Rows are fetched STREAM_BATCH_SIZE at a time and written as soon as they are 
+    serialized, so memory usage does not depend on the number of rows.
+
+    Arguments:
+        query: the query to stream.
+        representation: function returning the representation of a row.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        chunk = []
+        size = 0
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            line = dumps(representation(row), separators=(',', ':')) + '\n'
+            chunk.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)